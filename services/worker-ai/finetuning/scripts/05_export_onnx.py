@@ -7,7 +7,9 @@ import shutil
 from pathlib import Path
 
 
-def export(run_name: str, imgsz: int, opset: int, output_name: str) -> None:
+def export(
+    run_name: str, imgsz: int, opset: int, output_name: str, nms: bool, half: bool
+) -> None:
     try:
         from ultralytics import YOLO
     except Exception:
@@ -22,7 +24,8 @@ def export(run_name: str, imgsz: int, opset: int, output_name: str) -> None:
         raise SystemExit(1)
 
     model = YOLO(str(best_pt))
-    model.export(format="onnx", dynamic=True, opset=opset, imgsz=imgsz)
+    # nms=True embebe el NMS en el grafo: salida [1, N, 6] = x1, y1, x2, y2, conf, cls
+    model.export(format="onnx", dynamic=True, opset=opset, imgsz=imgsz, nms=nms)
 
     source = best_pt.parent / "best.onnx"
     if not source.exists():
@@ -36,6 +39,37 @@ def export(run_name: str, imgsz: int, opset: int, output_name: str) -> None:
     shutil.copy2(source, destination)
     print("[OK] Export ONNX ->", destination)
 
+    if half:
+        export_half(model, best_pt, imgsz, opset, nms, destination)
+
+
+def export_half(
+    model, best_pt: Path, imgsz: int, opset: int, nms: bool, fp32_model: Path
+) -> None:
+    """Exporta la variante FP16 (<stem>.fp16.onnx) que el worker carga con precision = "fp16"."""
+    # ultralytics solo exporta ONNX en half sobre GPU (en CPU ignora half=True)
+    model.export(
+        format="onnx", dynamic=True, opset=opset, imgsz=imgsz, nms=nms, half=True, device=0
+    )
+
+    source = best_pt.parent / "best.onnx"
+    try:
+        import onnx
+
+        input_type = onnx.load(str(source), load_external_data=False).graph.input[0].type
+        is_fp16 = input_type.tensor_type.elem_type == onnx.TensorProto.FLOAT16
+    except Exception:
+        print("[!] Falta onnx para verificar el export FP16. Instalá con: pip install onnx")
+        raise SystemExit(1)
+
+    if not is_fp16:
+        print("[!] El export FP16 salió en FP32 (¿sin GPU CUDA?). No se escribe la variante.")
+        raise SystemExit(1)
+
+    destination = fp32_model.with_name(f"{fp32_model.stem}.fp16{fp32_model.suffix}")
+    shutil.copy2(source, destination)
+    print("[OK] Export ONNX FP16 ->", destination)
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="05 - Exportar best.pt a ONNX")
@@ -43,12 +77,22 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--imgsz", type=int, default=640, help="Resolución usada en entrenamiento")
     parser.add_argument("--opset", type=int, default=13, help="Versión opset ONNX")
     parser.add_argument("--out", default="yolo11s_camera.onnx", help="Nombre del ONNX final")
+    parser.add_argument(
+        "--nms",
+        action="store_true",
+        help="Embeber NMS en el grafo ONNX (el worker lo detecta y omite el postproceso en Python)",
+    )
+    parser.add_argument(
+        "--half",
+        action="store_true",
+        help="Exportar además <out>.fp16.onnx (requiere GPU CUDA; worker: model.precision = \"fp16\")",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    export(args.name, args.imgsz, args.opset, args.out)
+    export(args.name, args.imgsz, args.opset, args.out, args.nms, args.half)
 
 
 if __name__ == "__main__":
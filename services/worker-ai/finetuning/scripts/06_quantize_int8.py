@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Optional step 6 - Quantize the exported ONNX model to INT8 for CPU deployments.
+"""
+import argparse
+import random
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+
+def letterbox(image: np.ndarray, imgsz: int) -> np.ndarray:
+    """Same preprocessing as the worker: letterbox 114, BGR, NCHW float32 / 255."""
+    import cv2
+
+    img_h, img_w = image.shape[:2]
+    scale = min(imgsz / img_w, imgsz / img_h)
+    new_w, new_h = int(img_w * scale), int(img_h * scale)
+    pad_w, pad_h = (imgsz - new_w) // 2, (imgsz - new_h) // 2
+
+    padded = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    padded[pad_h : pad_h + new_h, pad_w : pad_w + new_w] = cv2.resize(
+        image, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+    )
+    return (padded.transpose(2, 0, 1)[None] / np.float32(255.0)).astype(np.float32)
+
+
+def collect_frames(frames_dir: Path, limit: int, seed: int) -> List[Path]:
+    images = sorted(
+        p for p in frames_dir.rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+    )
+    if not images:
+        print(f"[!] No se encontraron imágenes en {frames_dir}. Ejecutá el script 01.")
+        raise SystemExit(1)
+
+    random.Random(seed).shuffle(images)
+    return images[:limit]
+
+
+def quantize(
+    model: Path, frames_dir: Path, out: Optional[Path], imgsz: int, limit: int, seed: int
+) -> None:
+    try:
+        import cv2
+        from onnxruntime.quantization import (
+            CalibrationDataReader,
+            QuantFormat,
+            QuantType,
+            quantize_static,
+        )
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+    except Exception:
+        print("[!] Faltan dependencias. Instalá con: pip install onnxruntime opencv-python")
+        raise SystemExit(1)
+
+    if not model.exists():
+        print(f"[!] No existe {model}. Ejecutá primero el script 05.")
+        raise SystemExit(1)
+
+    images = collect_frames(frames_dir, limit, seed)
+    print(f"[i] Calibrando con {len(images)} frames de {frames_dir}")
+
+    class FrameReader(CalibrationDataReader):
+        """Feeds real camera frames so activation ranges match production."""
+
+        def __init__(self, input_name: str):
+            self.input_name = input_name
+            self.paths = iter(images)
+
+        def get_next(self):
+            for path in self.paths:
+                image = cv2.imread(str(path))
+                if image is not None:
+                    return {self.input_name: letterbox(image, imgsz)}
+            return None
+
+    import onnx
+
+    input_name = onnx.load(str(model), load_external_data=False).graph.input[0].name
+
+    # Nombre esperado por el worker con model.precision = "int8"
+    destination = out or model.with_name(f"{model.stem}.int8{model.suffix}")
+    prepared = destination.with_name(f"{destination.stem}.prep{destination.suffix}")
+
+    quant_pre_process(str(model), str(prepared))
+    try:
+        quantize_static(
+            str(prepared),
+            str(destination),
+            FrameReader(input_name),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+        )
+    finally:
+        prepared.unlink(missing_ok=True)
+
+    size_in = model.stat().st_size / 1e6
+    size_out = destination.stat().st_size / 1e6
+    print(f"[OK] Modelo INT8 -> {destination} ({size_in:.1f} MB -> {size_out:.1f} MB)")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="06 - Cuantizar el ONNX exportado a INT8 (calibración con frames reales)"
+    )
+    parser.add_argument("--model", default="models/yolo11s_camera.onnx", help="ONNX exportado en 05")
+    parser.add_argument("--frames", default="frames", help="Carpeta con frames de la cámara (01)")
+    parser.add_argument("--out", default=None, help="ONNX de salida (default <modelo>.int8.onnx)")
+    parser.add_argument("--imgsz", type=int, default=640, help="Resolución usada en el export")
+    parser.add_argument("--num", type=int, default=200, help="Cantidad de frames de calibración")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla para elegir los frames")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    quantize(
+        Path(args.model),
+        Path(args.frames),
+        Path(args.out) if args.out else None,
+        args.imgsz,
+        args.num,
+        args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -75,4 +75,4 @@ echo "   Presiona Ctrl+C para detener"
 echo ""
 
 # Ejecutar worker con mamba run
-mamba run -n worker-ai python worker.py
+mamba run -n worker-ai python -m src.main
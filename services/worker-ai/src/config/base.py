@@ -15,6 +15,10 @@ class ServerConfig:
     bind_host: str = "0.0.0.0"
     bind_port: int = 7001
     idle_timeout_sec: int = 60
+    max_connections: int = 64
+    backlog: int = 1024
+    reuse_port: bool = True
+    shutdown_timeout_s: float = 10.0
 
 
 @dataclass
@@ -26,6 +30,17 @@ class ModelConfig:
     classes: List[str] = field(default_factory=list)
     class_catalog: List[str] = field(default_factory=list)
     class_catalog_path: Optional[str] = None
+    use_tensorrt: bool = True
+    trt_fp16: bool = True
+    trt_cache_dir: str = "/tmp/trt_cache"
+    precision: str = "fp32"
+    cuda_color_convert: bool = False
+    gpu_jpeg_decode: bool = False
+    fused_preprocess: bool = False
+    infer_workers: int = 2
+    max_batch: int = 8
+    batch_wait_ms: float = 2.0
+    idle_unload_s: float = 300.0
 
 
 @dataclass
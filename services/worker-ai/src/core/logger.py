@@ -3,6 +3,9 @@
 import logging
 import sys
 
+# Errores de un handler (p.ej. stdout cerrado) no deben imprimir trazas por registro
+logging.raiseExceptions = False
+
 
 def setup_logger(name: str, level: int = logging.INFO) -> logging.Logger:
     """Configura un logger con formato consistente"""
@@ -22,4 +25,7 @@ def setup_logger(name: str, level: int = logging.INFO) -> logging.Logger:
     handler.setFormatter(formatter)
 
     logger.addHandler(handler)
+    # Cada logger tiene su propio handler: sin propagar, un registro de
+    # "server.connection" no se escribe dos veces (también vía "server")
+    logger.propagate = False
     return logger
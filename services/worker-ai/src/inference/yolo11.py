@@ -1,13 +1,32 @@
 """Modelo YOLO11 con ONNX Runtime"""
 
+import hashlib
+import tempfile
+import threading
+
 import numpy as np
 import onnxruntime as ort
 import cv2
 from typing import List, Tuple, Optional
 from dataclasses import dataclass
+from pathlib import Path
 
 from ..core.logger import setup_logger
 
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - numba es opcional
+    NUMBA_AVAILABLE = False
+
+try:
+    import onnx
+
+    ONNX_AVAILABLE = True
+except ImportError:  # pragma: no cover - onnx es opcional (perfiles TensorRT)
+    ONNX_AVAILABLE = False
+
 logger = setup_logger("inference")
 
 
@@ -96,6 +115,43 @@ DEFAULT_CLASS_NAMES = [
 ]
 
 
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True, fastmath=True)
+    def _nms_numba(boxes, scores, iou_threshold):
+        """NMS compilado a código nativo (mismo criterio que YOLO11Model.nms)"""
+        n = boxes.shape[0]
+        order = np.argsort(-scores)
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        suppressed = np.zeros(n, dtype=np.bool_)
+        keep = np.empty(n, dtype=np.int32)
+        count = 0
+
+        for oi in range(n):
+            i = order[oi]
+            if suppressed[i]:
+                continue
+            keep[count] = i
+            count += 1
+
+            for oj in range(oi + 1, n):
+                j = order[oj]
+                if suppressed[j]:
+                    continue
+                xx1 = max(boxes[i, 0], boxes[j, 0])
+                yy1 = max(boxes[i, 1], boxes[j, 1])
+                xx2 = min(boxes[i, 2], boxes[j, 2])
+                yy2 = min(boxes[i, 3], boxes[j, 3])
+                w = max(0.0, xx2 - xx1)
+                h = max(0.0, yy2 - yy1)
+                inter = w * h
+                iou = inter / (areas[i] + areas[j] - inter)
+                if iou > iou_threshold:
+                    suppressed[j] = True
+
+        return keep[:count]
+
+
 @dataclass
 class Detection:
     """Una detección YOLO"""
@@ -119,10 +175,26 @@ class Detection:
 class YOLO11Model:
     """Modelo YOLO11 con ONNX Runtime"""
 
-    def __init__(self, model_path: str, class_names: Optional[List[str]] = None):
+    def __init__(
+        self,
+        model_path: str,
+        class_names: Optional[List[str]] = None,
+        use_tensorrt: bool = True,
+        trt_fp16: bool = True,
+        trt_cache_dir: str = "/tmp/trt_cache",
+        max_batch: int = 8,
+        fused_preprocess: bool = False,
+    ):
         """
         Args:
             model_path: Ruta al modelo ONNX
+            class_names: Catálogo de clases (fallback COCO si es None)
+            use_tensorrt: Usar TensorrtExecutionProvider si está disponible
+            trt_fp16: Habilitar kernels FP16 en TensorRT
+            trt_cache_dir: Directorio de cache de engines TensorRT
+            max_batch: Lote máximo que armará el batcher (perfil TensorRT)
+            fused_preprocess: Mover cast/transpose/normalización al grafo ONNX
+                (la entrada pasa a ser el letterbox uint8 NHWC)
         """
         self.model_path = model_path
 
@@ -142,22 +214,59 @@ class YOLO11Model:
                 len(self.class_names),
             )
 
+        # Con preproceso fusionado el provider (GPU con CUDA/TensorRT) hace la
+        # pasada FP32 y el host solo copia el letterbox uint8 (4x menos bytes)
+        session_path = model_path
+        self.fused_preprocess = False
+        if fused_preprocess:
+            fused_path = self._fuse_preprocess(model_path)
+            if fused_path is not None:
+                session_path = fused_path
+                self.fused_preprocess = True
+
         # Crear sesión ONNX
-        providers = ["CUDAExecutionProvider", "CPUExecutionProvider"]
-        self.session = ort.InferenceSession(model_path, providers=providers)
+        providers = self._build_providers(
+            session_path, use_tensorrt, trt_fp16, trt_cache_dir, max_batch
+        )
+        self.session = ort.InferenceSession(session_path, providers=providers)
+        logger.info(f"Providers activos: {self.session.get_providers()}")
 
         # Obtener metadata del modelo
         self.input_name = self.session.get_inputs()[0].name
         self.input_shape = self.session.get_inputs()[0].shape
+        if self.fused_preprocess:
+            self.input_dtype = np.uint8
+        elif self.session.get_inputs()[0].type == "tensor(float16)":
+            self.input_dtype = np.float16
+        else:
+            self.input_dtype = np.float32
         self.output_shape = self.session.get_outputs()[0].shape
+        self.output_name = self.session.get_outputs()[0].name
+
+        # Buffers de preproceso e IOBinding por thread (ver _input_buffer/_run)
+        self._scratch = threading.local()
+
+        # Con provider GPU la entrada se copia a un OrtValue de device reservado
+        # una sola vez por thread (evita reservar memoria en cada corrida)
+        self._device = (
+            "cpu"
+            if self.session.get_providers()[0] == "CPUExecutionProvider"
+            else "cuda"
+        )
+
+        # Batch dinámico (export con dynamic=True) → se pueden agrupar frames
+        self.supports_batch = not isinstance(self.input_shape[0], int)
 
         # Si el shape es dinámico (strings), usar valores por defecto de YOLO11
-        if isinstance(self.input_shape[2], str) or isinstance(self.input_shape[3], str):
+        height, width = (
+            self.input_shape[1:3] if self.fused_preprocess else self.input_shape[2:4]
+        )
+        if isinstance(height, str) or isinstance(width, str):
             self.input_height = 640
             self.input_width = 640
         else:
-            self.input_height = self.input_shape[2]
-            self.input_width = self.input_shape[3]
+            self.input_height = height
+            self.input_width = width
 
         # Detectar si el modelo tiene NMS integrado
         # Formato con NMS: [batch, max_detections, 6] donde 6 = [x1, y1, x2, y2, conf, class]
@@ -186,6 +295,207 @@ class YOLO11Model:
         logger.info(f"Input shape: {self.input_shape}")
         logger.info(f"Output shape: {self.output_shape}")
         logger.info(f"NMS integrado: {self.has_integrated_nms}")
+        logger.info(f"Batch dinámico: {self.supports_batch}")
+        logger.info(f"Preproceso fusionado: {self.fused_preprocess}")
+
+    @staticmethod
+    def _build_providers(
+        model_path: str,
+        use_tensorrt: bool,
+        trt_fp16: bool,
+        trt_cache_dir: str,
+        max_batch: int,
+    ) -> list:
+        """Arma la lista de providers priorizando TensorRT si está disponible"""
+        providers: list = ["CUDAExecutionProvider", "CPUExecutionProvider"]
+        if use_tensorrt and "TensorrtExecutionProvider" in ort.get_available_providers():
+            # El engine se compila en la primera corrida (puede tardar minutos);
+            # la cache en disco evita recompilar en reinicios posteriores
+            Path(trt_cache_dir).mkdir(parents=True, exist_ok=True)
+            trt_options = {
+                "trt_fp16_enable": trt_fp16,
+                "trt_engine_cache_enable": True,
+                "trt_engine_cache_path": trt_cache_dir,
+                "trt_timing_cache_enable": True,
+                "trt_timing_cache_path": trt_cache_dir,
+                "trt_max_workspace_size": 4 * 1024**3,
+            }
+            trt_options.update(YOLO11Model._trt_profile(model_path, max_batch))
+            providers.insert(0, ("TensorrtExecutionProvider", trt_options))
+            logger.info(
+                f"TensorRT habilitado (fp16={trt_fp16}, cache={trt_cache_dir})"
+            )
+        return providers
+
+    @staticmethod
+    def _trt_profile(model_path: str, max_batch: int) -> dict:
+        """
+        Perfil de shapes TensorRT para modelos con batch dinámico
+
+        Sin perfil explícito TensorRT compila (y cachea) un engine nuevo por cada
+        tamaño de lote que arma el batcher; con min=1 y max=max_batch alcanza
+        con uno solo.
+
+        Args:
+            model_path: Ruta al modelo ONNX
+            max_batch: Lote máximo esperado
+
+        Returns:
+            Opciones trt_profile_* (vacío si el batch es fijo o no se puede leer)
+        """
+        if not ONNX_AVAILABLE:
+            return {}
+        try:
+            graph_input = onnx.load(model_path, load_external_data=False).graph.input[0]
+        except Exception as e:
+            logger.warning(f"No se pudo leer el input ONNX para el perfil TensorRT: {e}")
+            return {}
+
+        dims = graph_input.type.tensor_type.shape.dim
+        if len(dims) != 4 or dims[0].dim_value > 0:
+            return {}
+
+        # H/W dinámicos → mismo default que usa el preproceso (640)
+        rest = "x".join(str(dim.dim_value or 640) for dim in dims[1:])
+
+        def shape(batch: int) -> str:
+            return f"{graph_input.name}:{batch}x{rest}"
+
+        return {
+            "trt_profile_min_shapes": shape(1),
+            "trt_profile_opt_shapes": shape(max(1, max_batch)),
+            "trt_profile_max_shapes": shape(max(1, max_batch)),
+        }
+
+    @staticmethod
+    def _fuse_preprocess(model_path: str) -> Optional[str]:
+        """
+        Genera una variante del modelo con el preproceso dentro del grafo
+
+        Antepone Transpose(NHWC→NCHW) → Cast(float) → Div(255) [→ Cast(fp16)] a
+        la entrada original, de modo que el modelo recibe el letterbox uint8
+        tal cual. El resultado se cachea en disco por ruta/tamaño/mtime (el
+        nombre único también evita colisiones en la cache de engines TensorRT).
+
+        Args:
+            model_path: Ruta al modelo ONNX original
+
+        Returns:
+            Ruta al modelo fusionado o None si no se pudo generar
+        """
+        if not ONNX_AVAILABLE:
+            logger.warning("onnx no disponible, preproceso fusionado deshabilitado")
+            return None
+
+        source = Path(model_path).resolve()
+        try:
+            stat = source.stat()
+            key = hashlib.sha1(
+                f"{source}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+            ).hexdigest()[:12]
+            target = (
+                Path(tempfile.gettempdir())
+                / "worker-ai"
+                / f"{source.stem}.{key}.u8.onnx"
+            )
+            if target.exists():
+                return str(target)
+
+            model = onnx.load(str(source))
+            graph = model.graph
+            original = graph.input[0]
+            tensor_type = original.type.tensor_type
+            dims = tensor_type.shape.dim
+            if len(dims) != 4 or tensor_type.elem_type not in (
+                onnx.TensorProto.FLOAT,
+                onnx.TensorProto.FLOAT16,
+            ):
+                logger.warning(
+                    "Entrada no soportada para preproceso fusionado, "
+                    "se usa el modelo original"
+                )
+                return None
+
+            batch = dims[0].dim_param or dims[0].dim_value or "batch"
+            height = dims[2].dim_value or 640
+            width = dims[3].dim_value or 640
+            name = original.name
+            prefix = f"{name}_pre"
+
+            nodes = [
+                onnx.helper.make_node(
+                    "Transpose", [f"{name}_u8"], [f"{prefix}_nchw"], perm=[0, 3, 1, 2]
+                ),
+                onnx.helper.make_node(
+                    "Cast",
+                    [f"{prefix}_nchw"],
+                    [f"{prefix}_f32"],
+                    to=onnx.TensorProto.FLOAT,
+                ),
+            ]
+            if tensor_type.elem_type == onnx.TensorProto.FLOAT:
+                nodes.append(
+                    onnx.helper.make_node(
+                        "Div", [f"{prefix}_f32", f"{prefix}_scale"], [name]
+                    )
+                )
+            else:
+                nodes += [
+                    onnx.helper.make_node(
+                        "Div", [f"{prefix}_f32", f"{prefix}_scale"], [f"{prefix}_norm"]
+                    ),
+                    onnx.helper.make_node(
+                        "Cast",
+                        [f"{prefix}_norm"],
+                        [name],
+                        to=onnx.TensorProto.FLOAT16,
+                    ),
+                ]
+
+            graph.initializer.append(
+                onnx.helper.make_tensor(
+                    f"{prefix}_scale", onnx.TensorProto.FLOAT, [], [255.0]
+                )
+            )
+            new_input = onnx.helper.make_tensor_value_info(
+                f"{name}_u8", onnx.TensorProto.UINT8, [batch, height, width, 3]
+            )
+            graph.input.remove(original)
+            graph.input.insert(0, new_input)
+            for node in reversed(nodes):
+                graph.node.insert(0, node)
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_target = target.with_suffix(".tmp")
+            onnx.save(model, str(tmp_target))
+            tmp_target.replace(target)
+            logger.info(f"Modelo con preproceso fusionado generado: {target}")
+            return str(target)
+
+        except Exception as e:
+            logger.warning(
+                f"No se pudo fusionar el preproceso ({e}), se usa el modelo original"
+            )
+            return None
+
+    def _input_shape(self, batch_size: int) -> Tuple[int, ...]:
+        """Shape del tensor de entrada (NHWC uint8 si el preproceso está fusionado)"""
+        if self.fused_preprocess:
+            return (batch_size, self.input_height, self.input_width, 3)
+        return (batch_size, 3, self.input_height, self.input_width)
+
+    def warmup(self, iterations: int = 3):
+        """
+        Ejecuta inferencias dummy para inicializar el provider (contexto CUDA,
+        búsqueda de algoritmos cuDNN) antes del primer frame real
+
+        Args:
+            iterations: Cantidad de inferencias dummy a ejecutar
+        """
+        dummy = np.zeros(self._input_shape(1), dtype=self.input_dtype)
+        for _ in range(iterations):
+            self.session.run(None, {self.input_name: dummy})
+        logger.info(f"Warm-up completado ({iterations} inferencias dummy)")
 
     def _class_name(self, class_id: int) -> str:
         """Obtiene el nombre de clase seguro para el ID dado"""
@@ -193,12 +503,77 @@ class YOLO11Model:
             return self.class_names[class_id]
         return f"class_{class_id}"
 
+    def _input_buffer(self, batch_size: int) -> np.ndarray:
+        """
+        Tensor de entrada reutilizable del thread actual (crece si hace falta)
+
+        Cada thread del pool de inferencia tiene sus propios buffers, por lo que
+        no se comparten entre corridas concurrentes.
+        """
+        blob = getattr(self._scratch, "blob", None)
+        if blob is None or blob.shape[0] < batch_size:
+            blob = np.empty(self._input_shape(batch_size), dtype=self.input_dtype)
+            self._scratch.blob = blob
+        return blob[:batch_size]
+
+    def _padded_buffer(self) -> np.ndarray:
+        """Buffer BGR letterbox reutilizable del thread actual"""
+        padded = getattr(self._scratch, "padded", None)
+        if padded is None:
+            padded = np.empty((self.input_height, self.input_width, 3), dtype=np.uint8)
+            self._scratch.padded = padded
+        return padded
+
+    def _run(self, input_tensor: np.ndarray) -> np.ndarray:
+        """
+        Ejecuta la sesión con IOBinding sobre los buffers del thread actual
+
+        En CPU la entrada se bindea sin copias; con CUDA/TensorRT se reutiliza
+        un OrtValue de device por shape y solo se copia el contenido.
+
+        Args:
+            input_tensor: Tensor de entrada (vista de _input_buffer)
+
+        Returns:
+            Primera salida del modelo
+        """
+        binding = getattr(self._scratch, "binding", None)
+        if binding is None:
+            binding = self.session.io_binding()
+            self._scratch.binding = binding
+            self._scratch.device_inputs = {}
+
+        if self._device == "cpu":
+            binding.bind_cpu_input(self.input_name, input_tensor)
+        else:
+            device_inputs = self._scratch.device_inputs
+            ort_value = device_inputs.get(input_tensor.shape)
+            if ort_value is None:
+                ort_value = ort.OrtValue.ortvalue_from_numpy(
+                    input_tensor, self._device, 0
+                )
+                device_inputs[input_tensor.shape] = ort_value
+            else:
+                ort_value.update_inplace(input_tensor)
+            binding.bind_ortvalue_input(self.input_name, ort_value)
+
+        # La salida se re-bindea en cada corrida: su shape depende del batch
+        binding.clear_binding_outputs()
+        binding.bind_output(self.output_name, "cpu")
+        self.session.run_with_iobinding(binding)
+        return binding.copy_outputs_to_cpu()[0]
+
     def preprocess(
-        self, image: np.ndarray
+        self, image: np.ndarray, out: Optional[np.ndarray] = None
     ) -> Tuple[np.ndarray, float, Tuple[int, int]]:
         """
         Preprocesa imagen para YOLO11
 
+        Args:
+            image: Imagen BGR (HxWx3)
+            out: Tensor (1, 3, H, W) donde escribir el resultado (se aloca si es None);
+                con preproceso fusionado es (1, H, W, 3) uint8
+
         Returns:
             (input_tensor, scale, (pad_w, pad_h))
         """
@@ -209,21 +584,31 @@ class YOLO11Model:
         new_w = int(img_w * scale)
         new_h = int(img_h * scale)
 
-        # Resize
-        resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
-
         # Padding para llegar a input_width x input_height
         pad_w = (self.input_width - new_w) // 2
         pad_h = (self.input_height - new_h) // 2
 
-        padded = np.full((self.input_height, self.input_width, 3), 114, dtype=np.uint8)
-        padded[pad_h : pad_h + new_h, pad_w : pad_w + new_w] = resized
+        if out is None:
+            out = np.empty(self._input_shape(1), dtype=self.input_dtype)
+
+        # Resize directo sobre la región central del buffer letterbox
+        # (con preproceso fusionado el letterbox ya es la entrada del modelo)
+        padded = out[0] if self.fused_preprocess else self._padded_buffer()
+        padded.fill(114)
+        cv2.resize(
+            image,
+            (new_w, new_h),
+            dst=padded[pad_h : pad_h + new_h, pad_w : pad_w + new_w],
+            interpolation=cv2.INTER_LINEAR,
+        )
+
+        if self.fused_preprocess:
+            return out, scale, (pad_w, pad_h)
 
-        # Convertir a formato ONNX: (1, 3, H, W), float32, normalizado
-        input_tensor = padded.transpose(2, 0, 1).astype(np.float32) / 255.0
-        input_tensor = np.expand_dims(input_tensor, axis=0)
+        # Convertir a formato ONNX: (1, 3, H, W), normalizado, sin temporales
+        np.divide(padded.transpose(2, 0, 1), np.float32(255.0), out=out[0])
 
-        return input_tensor, scale, (pad_w, pad_h)
+        return out, scale, (pad_w, pad_h)
 
     def postprocess_with_nms(
         self,
@@ -257,56 +642,52 @@ class YOLO11Model:
 
         # output ahora es (N, 6) donde N es número de detecciones
         # Formato: [x1, y1, x2, y2, confidence, class_id]
+        confidences = output[:, 4].astype(np.float32, copy=False)
+        class_ids = output[:, 5].astype(np.int32)
 
-        detections = []
-        for det in output:
-            x1, y1, x2, y2, conf, class_id = det
+        # Filtrar por confianza y clase en una sola máscara
+        mask = confidences >= conf_thres
+        if classes_filter is not None and len(classes_filter) > 0:
+            mask &= np.isin(class_ids, classes_filter)
 
-            # Filtrar por confianza
-            if conf < conf_thres:
-                continue
+        # Las coordenadas ya están en formato xyxy en espacio letterbox
+        xyxy = output[mask, :4].astype(np.float32, copy=False)
+        confidences = confidences[mask]
+        class_ids = class_ids[mask]
 
-            # Convertir class_id a entero
-            class_id = int(class_id)
+        if len(xyxy) == 0:
+            return []
 
-            # Filtrar por clase si es necesario
-            if classes_filter is not None and len(classes_filter) > 0:
-                if class_id not in classes_filter:
-                    continue
+        # Deshacer padding y escala
+        xyxy -= np.array([pad_w, pad_h, pad_w, pad_h], dtype=np.float32)
+        xyxy /= scale
 
-            # Las coordenadas ya están en formato xyxy en espacio letterbox
-            # Deshacer padding y escala
-            x1 = (x1 - pad_w) / scale
-            y1 = (y1 - pad_h) / scale
-            x2 = (x2 - pad_w) / scale
-            y2 = (y2 - pad_h) / scale
-
-            # Clip a dimensiones originales
-            x1 = max(0, min(x1, orig_w))
-            y1 = max(0, min(y1, orig_h))
-            x2 = max(0, min(x2, orig_w))
-            y2 = max(0, min(y2, orig_h))
-
-            # Validar bbox
-            if x2 <= x1 or y2 <= y1:
-                continue
+        # Clip a dimensiones originales
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, orig_w)
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, orig_h)
 
-            # Normalizar a [0, 1]
-            x1_norm = x1 / orig_w
-            y1_norm = y1 / orig_h
-            x2_norm = x2 / orig_w
-            y2_norm = y2 / orig_h
+        # Validar bbox
+        valid = (xyxy[:, 2] > xyxy[:, 0]) & (xyxy[:, 3] > xyxy[:, 1])
+        xyxy = xyxy[valid]
+        confidences = confidences[valid]
+        class_ids = class_ids[valid]
 
-            # Nombre de clase
-            class_name = self._class_name(class_id)
+        # Normalizar a [0, 1]
+        xyxy[:, [0, 2]] /= orig_w
+        xyxy[:, [1, 3]] /= orig_h
 
-            detection = Detection(
-                class_id=class_id,
-                class_name=class_name,
-                confidence=float(conf),
-                bbox=(float(x1_norm), float(y1_norm), float(x2_norm), float(y2_norm)),
+        detections = []
+        for box, conf, cid in zip(
+            xyxy.tolist(), confidences.tolist(), class_ids.tolist()
+        ):
+            detections.append(
+                Detection(
+                    class_id=cid,
+                    class_name=self._class_name(cid),
+                    confidence=conf,
+                    bbox=tuple(box),
+                )
             )
-            detections.append(detection)
 
         return detections
 
@@ -418,6 +799,9 @@ class YOLO11Model:
             ).squeeze(1)
 
         confidences = class_max if obj is None else (class_max * obj)
+        # IDs de clase en int32 (argmax devuelve int64) y confianzas en float32
+        class_ids = class_ids.astype(np.int32, copy=False)
+        confidences = confidences.astype(np.float32, copy=False)
 
         # --- FILTROS ---
         # 1. Filtrar por umbral de confianza (después de elegir clase efectiva)
@@ -430,18 +814,11 @@ class YOLO11Model:
             return []
 
         # --- TRANSFORMACIÓN DE COORDENADAS ---
-        # Convertir de xywh a xyxy en espacio letterbox
-        x_center, y_center, width, height = (
-            xywh[:, 0],
-            xywh[:, 1],
-            xywh[:, 2],
-            xywh[:, 3],
-        )
-        x1 = x_center - width / 2
-        y1 = y_center - height / 2
-        x2 = x_center + width / 2
-        y2 = y_center + height / 2
-        xyxy = np.stack([x1, y1, x2, y2], axis=1).astype(np.float32)
+        # Convertir de xywh a xyxy en espacio letterbox (directo sobre float32)
+        half_wh = xywh[:, 2:4] * 0.5
+        xyxy = np.empty((len(xywh), 4), dtype=np.float32)
+        np.subtract(xywh[:, 0:2], half_wh, out=xyxy[:, 0:2])
+        np.add(xywh[:, 0:2], half_wh, out=xyxy[:, 2:4])
 
         # Deshacer padding y escala para volver al espacio original
         xyxy -= np.array([pad_w, pad_h, pad_w, pad_h], dtype=np.float32)
@@ -474,7 +851,7 @@ class YOLO11Model:
             keep_indices_list.extend(idxs[kept_local].tolist())
         if not keep_indices_list:
             return []
-        keep_indices = np.array(keep_indices_list, dtype=int)
+        keep_indices = np.array(keep_indices_list, dtype=np.intp)
 
         # Mantener solo los elementos que NMS conservó
         xyxy_kept = xyxy[keep_indices]
@@ -488,22 +865,18 @@ class YOLO11Model:
         xyxy_norm[:, [1, 3]] /= orig_h
         xyxy_norm = np.clip(xyxy_norm, 0, 1)
 
-        # Crear detecciones
+        # Crear detecciones iterando los tres arrays en paralelo
+        # (tolist convierte a escalares Python en C, sin casts por elemento)
         detections = []
-        for i in range(len(xyxy_norm)):
-            cid = int(class_ids_kept[i])
+        for box, conf, cid in zip(
+            xyxy_norm.tolist(), confidences_kept.tolist(), class_ids_kept.tolist()
+        ):
             # Si el catálogo no cubre el ID, usar un nombre genérico
-            cname = self._class_name(cid)
             det = Detection(
                 class_id=cid,
-                class_name=cname,
-                confidence=float(confidences_kept[i]),
-                bbox=(
-                    float(xyxy_norm[i, 0]),
-                    float(xyxy_norm[i, 1]),
-                    float(xyxy_norm[i, 2]),
-                    float(xyxy_norm[i, 3]),
-                ),
+                class_name=self._class_name(cid),
+                confidence=conf,
+                bbox=tuple(box),
             )
             detections.append(det)
 
@@ -512,8 +885,15 @@ class YOLO11Model:
     @staticmethod
     def nms(
         boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = 0.45
-    ) -> List[int]:
-        """Non-Maximum Suppression"""
+    ) -> np.ndarray:
+        """Non-Maximum Suppression (usa Numba si está disponible)"""
+        if NUMBA_AVAILABLE:
+            return _nms_numba(
+                np.ascontiguousarray(boxes, dtype=np.float32),
+                np.ascontiguousarray(scores, dtype=np.float32),
+                np.float32(iou_threshold),
+            )
+
         x1 = boxes[:, 0]
         y1 = boxes[:, 1]
         x2 = boxes[:, 2]
@@ -541,7 +921,7 @@ class YOLO11Model:
             inds = np.where(iou <= iou_threshold)[0]
             order = order[inds + 1]
 
-        return keep
+        return np.array(keep, dtype=np.int32)
 
     def infer(
         self,
@@ -564,12 +944,85 @@ class YOLO11Model:
         """
         orig_h, orig_w = image.shape[:2]
 
-        # Preprocesar
-        input_tensor, scale, pad = self.preprocess(image)
+        # Preprocesar sobre el buffer reutilizable del thread
+        input_tensor, scale, pad = self.preprocess(image, out=self._input_buffer(1))
 
         # Inferencia
-        output = self.session.run(None, {self.input_name: input_tensor})[0]
+        output = self._run(input_tensor)
+
+        return self._postprocess_output(
+            output,
+            scale,
+            pad,
+            (orig_h, orig_w),
+            conf_thres=conf_thres,
+            nms_iou=nms_iou,
+            classes_filter=classes_filter,
+        )
+
+    def infer_batch(
+        self,
+        images: List[np.ndarray],
+        conf_thres: float = 0.5,
+        nms_iou: float = 0.6,
+        classes_filters: Optional[List[Optional[List[int]]]] = None,
+    ) -> List[List[Detection]]:
+        """
+        Ejecuta inferencia sobre varias imágenes con un único session.run
+
+        Si el modelo tiene batch fijo en 1, se ejecuta una corrida por imagen.
 
+        Args:
+            images: Imágenes BGR (HxWx3)
+            conf_thres: Umbral de confianza
+            nms_iou: Umbral IoU para NMS (ignorado si modelo tiene NMS integrado)
+            classes_filters: Filtro de clases por imagen (None = todas)
+
+        Returns:
+            Lista de detecciones por imagen (mismo orden que images)
+        """
+        if classes_filters is None:
+            classes_filters = [None] * len(images)
+
+        if not self.supports_batch or len(images) == 1:
+            return [
+                self.infer(img, conf_thres, nms_iou, classes_filter=cf)
+                for img, cf in zip(images, classes_filters)
+            ]
+
+        batch = self._input_buffer(len(images))
+        prepared = [
+            self.preprocess(img, out=batch[i : i + 1]) for i, img in enumerate(images)
+        ]
+
+        output = self._run(batch)
+
+        results = []
+        for i, (img, (_, scale, pad)) in enumerate(zip(images, prepared)):
+            results.append(
+                self._postprocess_output(
+                    output[i : i + 1],
+                    scale,
+                    pad,
+                    img.shape[:2],
+                    conf_thres=conf_thres,
+                    nms_iou=nms_iou,
+                    classes_filter=classes_filters[i],
+                )
+            )
+        return results
+
+    def _postprocess_output(
+        self,
+        output: np.ndarray,
+        scale: float,
+        pad: Tuple[int, int],
+        orig_shape: Tuple[int, int],
+        conf_thres: float,
+        nms_iou: float,
+        classes_filter: Optional[List[int]],
+    ) -> List[Detection]:
+        """Postprocesa la salida de una imagen según el tipo de modelo"""
         # Detectar NMS en runtime si aún no está definido
         if self.has_integrated_nms is None:
             if output.ndim == 3 and output.shape[-1] == 6:
@@ -587,23 +1040,21 @@ class YOLO11Model:
 
         # Postprocesar según el tipo de modelo
         if self.has_integrated_nms:
-            detections = self.postprocess_with_nms(
+            return self.postprocess_with_nms(
                 output,
                 scale,
                 pad,
-                (orig_h, orig_w),
+                orig_shape,
                 conf_thres=conf_thres,
                 classes_filter=classes_filter,
             )
-        else:
-            detections = self.postprocess(
-                output,
-                scale,
-                pad,
-                (orig_h, orig_w),
-                conf_thres=conf_thres,
-                nms_iou=nms_iou,
-                classes_filter=classes_filter,
-            )
 
-        return detections
+        return self.postprocess(
+            output,
+            scale,
+            pad,
+            orig_shape,
+            conf_thres=conf_thres,
+            nms_iou=nms_iou,
+            classes_filter=classes_filter,
+        )
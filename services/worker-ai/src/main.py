@@ -3,23 +3,35 @@
 
 Servidor TCP que recibe frames del edge-agent, ejecuta YOLO11 para detectar objetos,
 aplica tracking , y persiste los resultados en JSON por sesión.
+
+Uso (desde services/worker-ai): python -m src.main
 """
 import asyncio
-import sys
-from pathlib import Path
 
-# Agregar el directorio raíz al path para imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
+from google.protobuf.internal import api_implementation
 
 from src.core.logger import setup_logger
 from src.config.runtime import RuntimeConfig
 from src.server.server import WorkerServer
 
+try:
+    import uvloop
+
+    UVLOOP_AVAILABLE = True
+except ImportError:  # pragma: no cover - uvloop es opcional
+    UVLOOP_AVAILABLE = False
+
 logger = setup_logger("worker")
 
 
 async def main():
     """Función principal - Bootstrap del worker"""
+    logger.info(
+        "Event loop: %s | protobuf backend: %s",
+        type(asyncio.get_running_loop()).__name__,
+        api_implementation.Type(),
+    )
+
     # Cargar configuración runtime
     config = RuntimeConfig.from_toml("config.toml")
 
@@ -35,7 +47,14 @@ async def main():
         logger.info("Worker shutdown complete")
 
 
+def run():
+    """Ejecuta el worker usando uvloop si está disponible"""
+    if UVLOOP_AVAILABLE:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(main())
+
+
 if __name__ == "__main__":
     print("🤖 Worker AI - Starting...")
     print()
-    asyncio.run(main())
+    run()
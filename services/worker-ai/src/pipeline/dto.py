@@ -12,7 +12,7 @@ class InitRequest:
     model_path: str
 
 
-@dataclass
+@dataclass(slots=True)
 class FramePayload:
     """Payload de un frame a procesar"""
 
@@ -27,9 +27,9 @@ class FramePayload:
     ts_utc_ns: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Detection:
-    """Una detección individual"""
+    """Una detección individual (con __slots__: se crea una por track y por frame)"""
 
     x1: float
     y1: float
@@ -40,7 +40,7 @@ class Detection:
     track_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class FrameResult:
     """Resultado del procesamiento de un frame"""
 
@@ -1,5 +1,9 @@
 """Decodificadores de frames por formato"""
 
+import ctypes
+import ctypes.util
+import threading
+
 import cv2
 import numpy as np
 from typing import Optional, Callable, Dict
@@ -8,20 +12,242 @@ import ai_pb2 as pb
 
 from ..core.logger import setup_logger
 
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+
+    TURBOJPEG_AVAILABLE = True
+except ImportError:  # pragma: no cover - turbojpeg es opcional
+    TURBOJPEG_AVAILABLE = False
+
 logger = setup_logger("pipeline.decoder")
 
 
-# Tipo para funciones decodificadoras
-DecoderFunc = Callable[[bytes, int, int], Optional[np.ndarray]]
+# Proveedor de buffer BGR reutilizable: (width, height) → array (H, W, 3)
+ScratchFunc = Callable[[int, int], Optional[np.ndarray]]
+
+# Tipo para funciones decodificadoras: (data, width, height, scratch) → BGR
+# scratch es opcional; los decoders raw lo piden recién tras validar el tamaño
+DecoderFunc = Callable[[bytes, int, int, Optional[ScratchFunc]], Optional[np.ndarray]]
+
+
+def _cuda_device_count() -> int:
+    """Cantidad de GPUs CUDA visibles según el driver (0 si no hay driver)"""
+    try:
+        libcuda = ctypes.CDLL("libcuda.so.1")
+        count = ctypes.c_int(0)
+        if libcuda.cuInit(0) != 0 or libcuda.cuDeviceGetCount(ctypes.byref(count)) != 0:
+            return 0
+        return count.value
+    except OSError:
+        return 0
 
 
 class FrameDecoder:
     """Registro y aplicación de decodificadores por formato"""
 
-    def __init__(self):
+    def __init__(self, cuda_color: bool = False, gpu_jpeg: bool = False):
+        """
+        Args:
+            cuda_color: Convertir NV12/I420 a BGR con cv2.cuda si el build de
+                OpenCV lo soporta (fallback: cvtColor en CPU)
+            gpu_jpeg: Decodificar JPEG en GPU con nvJPEG (vía nvImageCodec)
+                si hay GPU disponible (fallback: libjpeg-turbo / cv2.imdecode)
+        """
         self._decoders: Dict[tuple, DecoderFunc] = {}
+        # (codec, pixel_format) del frame → decoder ya resuelto (incluye fallback)
+        self._resolved: Dict[tuple, DecoderFunc] = {}
+        self._jpeg = self._create_turbojpeg()
+        self._nvjpeg = self._create_nvjpeg() if gpu_jpeg else None
+        # El decoder de nvImageCodec se comparte entre los hilos del pool
+        self._nvjpeg_lock = threading.Lock()
+        self._libyuv = self._create_libyuv()
+        # GpuMat/Stream por hilo del pool de decodificación
+        self._cuda_scratch = threading.local()
+        # Códigos de conversión que cv2.cuda resolvió en el probe (por código:
+        # un build puede soportar NV12 y no I420)
+        self._cuda_codes = self._probe_cuda_color() if cuda_color else frozenset()
         self._register_default_decoders()
 
+    @staticmethod
+    def _create_turbojpeg():
+        """Instancia libjpeg-turbo si está disponible (fallback: cv2.imdecode)"""
+        if not TURBOJPEG_AVAILABLE:
+            logger.info("PyTurboJPEG no instalado, usando cv2.imdecode para JPEG")
+            return None
+        try:
+            jpeg = TurboJPEG()
+            logger.info("Decodificación JPEG con libjpeg-turbo")
+            return jpeg
+        except Exception as e:
+            # La librería nativa libturbojpeg puede no estar presente
+            logger.warning(f"No se pudo cargar libturbojpeg ({e}), usando cv2.imdecode")
+            return None
+
+    @staticmethod
+    def _create_nvjpeg():
+        """Crea un decoder nvJPEG y verifica que decodifique en este host"""
+        # Sin driver/GPU no se crea el decoder: nvImageCodec aborta el proceso
+        # al destruir un decoder cuyo backend nvJPEG no pudo cargarse
+        if _cuda_device_count() == 0:
+            logger.info("Sin GPU CUDA, JPEG se decodifica en CPU")
+            return None
+        # Import diferido: nvImageCodec avisa por stderr al importarse sin nvJPEG
+        try:
+            from nvidia import nvimgcodec
+        except ImportError:  # pragma: no cover - nvImageCodec (nvJPEG) es opcional
+            logger.info("nvImageCodec no instalado, JPEG se decodifica en CPU")
+            return None
+        try:
+            decoder = nvimgcodec.Decoder(
+                backend_kinds=[
+                    nvimgcodec.BackendKind.HW_GPU_ONLY,
+                    nvimgcodec.BackendKind.GPU_ONLY,
+                    nvimgcodec.BackendKind.HYBRID_CPU_GPU,
+                ]
+            )
+            params = nvimgcodec.DecodeParams(
+                apply_exif_orientation=False, color_spec=nvimgcodec.ColorSpec.RGB
+            )
+            _, probe = cv2.imencode(".jpg", np.zeros((16, 16, 3), dtype=np.uint8))
+            if decoder.decode(probe.tobytes(), params=params) is None:
+                logger.info("nvJPEG sin GPU utilizable, JPEG se decodifica en CPU")
+                return None
+        except Exception as e:
+            logger.warning(f"No se pudo inicializar nvJPEG ({e}), JPEG se decodifica en CPU")
+            return None
+
+        logger.info("Decodificación JPEG en GPU con nvJPEG")
+        return decoder, params
+
+    def _decode_jpeg_gpu(self, data: bytes) -> Optional[np.ndarray]:
+        """Decodifica JPEG con nvJPEG y copia el resultado a host como BGR"""
+        decoder, params = self._nvjpeg
+        with self._nvjpeg_lock:
+            image = decoder.decode(data, params=params)
+            if image is None:
+                return None
+            rgb = np.asarray(image.cpu())
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+    @staticmethod
+    def _create_libyuv() -> Optional[ctypes.CDLL]:
+        """Carga libyuv (conversión YUV→BGR SIMD en una pasada; fallback: cvtColor)"""
+        path = ctypes.util.find_library("yuv")
+        if path is None:
+            logger.info("libyuv no encontrada, usando cv2.cvtColor para NV12/I420")
+            return None
+        try:
+            lib = ctypes.CDLL(path)
+            ptr, stride = ctypes.c_void_p, ctypes.c_int
+            # RGB24 de libyuv es B,G,R en memoria (el orden de OpenCV)
+            lib.NV12ToRGB24.argtypes = [
+                ptr, stride, ptr, stride, ptr, stride, ctypes.c_int, ctypes.c_int
+            ]
+            lib.NV12ToRGB24.restype = ctypes.c_int
+            lib.I420ToRGB24.argtypes = [
+                ptr, stride, ptr, stride, ptr, stride, ptr, stride,
+                ctypes.c_int, ctypes.c_int,
+            ]
+            lib.I420ToRGB24.restype = ctypes.c_int
+        except (OSError, AttributeError) as e:
+            logger.warning(f"No se pudo cargar libyuv ({e}), usando cv2.cvtColor")
+            return None
+
+        logger.info("Conversión NV12/I420 con libyuv")
+        return lib
+
+    def _libyuv_cvt_color(
+        self, yuv: np.ndarray, code: int, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Convierte un frame YUV (H*3/2 x W, contiguo) a BGR con libyuv
+
+        Lee los planos directamente del buffer recibido, sin copias intermedias.
+        """
+        height = yuv.shape[0] * 2 // 3
+        width = yuv.shape[1]
+        bgr = out if out is not None else np.empty((height, width, 3), dtype=np.uint8)
+
+        src_y = yuv.ctypes.data
+        src_uv = src_y + width * height
+        dst = bgr.ctypes.data
+        if code == cv2.COLOR_YUV2BGR_NV12:
+            ret = self._libyuv.NV12ToRGB24(
+                src_y, width, src_uv, width, dst, width * 3, width, height
+            )
+        else:
+            chroma_size = width * height // 4
+            ret = self._libyuv.I420ToRGB24(
+                src_y, width,
+                src_uv, width // 2,
+                src_uv + chroma_size, width // 2,
+                dst, width * 3, width, height,
+            )
+
+        if ret != 0:
+            return cv2.cvtColor(yuv, code, dst=out)
+        return bgr
+
+    def _probe_cuda_color(self) -> frozenset:
+        """
+        Verifica qué conversiones YUV→BGR puede hacer cv2.cuda en este host
+
+        Returns:
+            Códigos cv2.COLOR_* soportados en GPU (vacío: todo en CPU)
+        """
+        try:
+            if cv2.cuda.getCudaEnabledDeviceCount() == 0:
+                logger.info("OpenCV sin dispositivos CUDA, conversión de color en CPU")
+                return frozenset()
+        except (AttributeError, cv2.error) as e:
+            logger.warning(f"cv2.cuda no disponible para conversión de color ({e}), usando CPU")
+            return frozenset()
+
+        supported = set()
+        for name, code in (
+            ("NV12", cv2.COLOR_YUV2BGR_NV12),
+            ("I420", cv2.COLOR_YUV2BGR_I420),
+        ):
+            try:
+                self._cuda_cvt_color(np.zeros((6, 4), dtype=np.uint8), code)
+            except (AttributeError, cv2.error) as e:
+                logger.warning(f"cv2.cuda no convierte {name} ({e}), usando CPU para {name}")
+                continue
+            logger.info(f"Conversión de color {name} en GPU (cv2.cuda)")
+            supported.add(code)
+        return frozenset(supported)
+
+    def _cuda_cvt_color(
+        self, yuv: np.ndarray, code: int, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """cvtColor en GPU reutilizando buffers y stream del hilo actual"""
+        scratch = self._cuda_scratch
+        if not hasattr(scratch, "stream"):
+            scratch.stream = cv2.cuda.Stream()
+            scratch.src = cv2.cuda_GpuMat()
+            scratch.dst = cv2.cuda_GpuMat()
+
+        scratch.src.upload(yuv, stream=scratch.stream)
+        cv2.cuda.cvtColor(scratch.src, code, dst=scratch.dst, stream=scratch.stream)
+        img = scratch.dst.download(stream=scratch.stream, dst=out)
+        scratch.stream.waitForCompletion()
+        return img
+
+    def _cvt_color(
+        self, yuv: np.ndarray, code: int, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Convierte YUV a BGR: GPU (si está habilitado), libyuv o cv2.cvtColor"""
+        if code in self._cuda_codes:
+            try:
+                return self._cuda_cvt_color(yuv, code, out)
+            except cv2.error as e:
+                # Deshabilitar GPU para este código y seguir en CPU
+                self._cuda_codes = self._cuda_codes - {code}
+                logger.warning(f"cv2.cuda falló convirtiendo ({e}), usando CPU")
+        if self._libyuv is not None:
+            return self._libyuv_cvt_color(yuv, code, out)
+        return cv2.cvtColor(yuv, code, dst=out)
+
     def _register_default_decoders(self):
         """Registra los decodificadores por defecto"""
         # JPEG
@@ -48,12 +274,19 @@ class FrameDecoder:
         """
         key = (codec, pixel_format)
         self._decoders[key] = decoder
+        self._resolved.clear()
         logger.debug(
             f"Decodificador registrado: codec={codec}, pixel_format={pixel_format}"
         )
 
     def decode(
-        self, data: bytes, codec: int, pixel_format: int, width: int, height: int
+        self,
+        data: bytes,
+        codec: int,
+        pixel_format: int,
+        width: int,
+        height: int,
+        scratch: Optional[ScratchFunc] = None,
     ) -> Optional[np.ndarray]:
         """
         Decodifica un frame según su formato
@@ -64,35 +297,48 @@ class FrameDecoder:
             pixel_format: Formato de pixel
             width: Ancho del frame
             height: Alto del frame
+            scratch: Proveedor del buffer BGR a reutilizar (solo NV12/I420 lo
+                usan, después de validar el tamaño de los datos; JPEG lo ignora)
 
         Returns:
             Imagen BGR (HxWx3) o None si falla
         """
-        # Intentar con codec específico primero
+        # Caso común: formato ya visto (una sola búsqueda por frame)
         key = (codec, pixel_format)
-        decoder = self._decoders.get(key)
+        decoder = self._resolved.get(key)
 
-        if decoder:
-            return decoder(data, width, height)
-
-        # Intentar con codec sin pixel_format
-        key = (codec, None)
-        decoder = self._decoders.get(key)
-
-        if decoder:
-            return decoder(data, width, height)
+        if decoder is None:
+            # Intentar con codec específico primero, luego codec sin pixel_format
+            decoder = self._decoders.get(key) or self._decoders.get((codec, None))
+            if decoder is None:
+                logger.error(
+                    f"No hay decodificador para codec={codec}, pixel_format={pixel_format}"
+                )
+                return None
+            self._resolved[key] = decoder
 
-        logger.error(
-            f"No hay decodificador para codec={codec}, pixel_format={pixel_format}"
-        )
-        return None
+        return decoder(data, width, height, scratch)
 
-    @staticmethod
-    def _decode_jpeg(data: bytes, width: int, height: int) -> Optional[np.ndarray]:
+    def _decode_jpeg(
+        self,
+        data: bytes,
+        width: int,
+        height: int,
+        scratch: Optional[ScratchFunc] = None,
+    ) -> Optional[np.ndarray]:
         """Decodifica JPEG"""
         try:
+            if self._nvjpeg is not None:
+                img = self._decode_jpeg_gpu(data)
+                if img is not None:
+                    return img
+
+            if self._jpeg is not None:
+                return self._jpeg.decode(data, pixel_format=TJPF_BGR)
+
             np_arr = np.frombuffer(data, np.uint8)
-            img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+            # Los frames del edge-agent no traen EXIF útil: omitir su parseo
+            img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
 
             if img is None:
                 logger.error("No se pudo decodificar JPEG")
@@ -104,8 +350,13 @@ class FrameDecoder:
             logger.error(f"Error decodificando JPEG: {e}")
             return None
 
-    @staticmethod
-    def _decode_nv12(data: bytes, width: int, height: int) -> Optional[np.ndarray]:
+    def _decode_nv12(
+        self,
+        data: bytes,
+        width: int,
+        height: int,
+        scratch: Optional[ScratchFunc] = None,
+    ) -> Optional[np.ndarray]:
         """Decodifica NV12 a BGR"""
         try:
             # NV12: Y plane (width*height) + UV plane (width*height/2)
@@ -118,10 +369,14 @@ class FrameDecoder:
                 )
                 return None
 
-            # Convertir NV12 a BGR usando OpenCV
-            nv12_data = np.frombuffer(data[: y_size + uv_size], dtype=np.uint8)
+            # Convertir NV12 a BGR (CUDA, libyuv o OpenCV)
+            # frombuffer con count: vista sobre los bytes, sin copiar el slice
+            nv12_data = np.frombuffer(data, dtype=np.uint8, count=y_size + uv_size)
             yuv = nv12_data.reshape((height * 3 // 2, width))
-            img = cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_NV12)
+            # Buffer de salida recién ahora: las dimensiones ya son consistentes
+            # con los datos (un fallo de asignación es un error de decodificación)
+            out = scratch(width, height) if scratch is not None else None
+            img = self._cvt_color(yuv, cv2.COLOR_YUV2BGR_NV12, out)
 
             return img
 
@@ -129,8 +384,13 @@ class FrameDecoder:
             logger.error(f"Error decodificando NV12: {e}")
             return None
 
-    @staticmethod
-    def _decode_i420(data: bytes, width: int, height: int) -> Optional[np.ndarray]:
+    def _decode_i420(
+        self,
+        data: bytes,
+        width: int,
+        height: int,
+        scratch: Optional[ScratchFunc] = None,
+    ) -> Optional[np.ndarray]:
         """Decodifica I420 a BGR"""
         try:
             y_size = width * height
@@ -141,9 +401,14 @@ class FrameDecoder:
                 logger.error("Frame I420 incompleto")
                 return None
 
-            i420_data = np.frombuffer(data[: y_size + u_size + v_size], dtype=np.uint8)
+            i420_data = np.frombuffer(
+                data, dtype=np.uint8, count=y_size + u_size + v_size
+            )
             yuv = i420_data.reshape((height * 3 // 2, width))
-            img = cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_I420)
+            # Buffer de salida recién ahora: las dimensiones ya son consistentes
+            # con los datos (un fallo de asignación es un error de decodificación)
+            out = scratch(width, height) if scratch is not None else None
+            img = self._cvt_color(yuv, cv2.COLOR_YUV2BGR_I420, out)
 
             return img
 
@@ -0,0 +1,183 @@
+"""Micro-batching de inferencia entre conexiones"""
+
+import asyncio
+from collections import defaultdict
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from functools import partial
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from ..core.logger import setup_logger
+from ..inference.yolo11 import Detection
+from .model_manager import ModelManager
+
+logger = setup_logger("pipeline.batcher")
+
+
+@dataclass
+class _InferRequest:
+    """Frame pendiente de inferencia"""
+
+    model_path: str
+    image: np.ndarray
+    classes_filter: Optional[List[int]]
+    future: asyncio.Future
+
+
+class InferenceBatcher:
+    """Agrupa frames de todas las conexiones en un único session.run"""
+
+    def __init__(
+        self,
+        model_manager: ModelManager,
+        executor: Optional[Executor] = None,
+        max_batch: int = 8,
+        max_wait_ms: float = 2.0,
+        max_inflight: int = 1,
+    ):
+        """
+        Args:
+            model_manager: Gestor de modelos (compartido)
+            executor: Pool donde se ejecuta la inferencia (None = default del loop)
+            max_batch: Tamaño máximo de lote
+            max_wait_ms: Espera máxima para completar un lote
+            max_inflight: Lotes ejecutándose en paralelo
+        """
+        self.model_manager = model_manager
+        self.executor = executor
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self.max_inflight = max(1, max_inflight)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Semaphore] = None
+        # Referencias a los lotes en ejecución (evita que el GC los recolecte)
+        self._dispatching: Set[asyncio.Task] = set()
+
+    async def submit(
+        self,
+        model_path: str,
+        image: np.ndarray,
+        classes_filter: Optional[List[int]] = None,
+    ) -> List[Detection]:
+        """
+        Encola un frame y espera sus detecciones
+
+        Args:
+            model_path: Ruta al modelo
+            image: Imagen BGR (HxWx3)
+            classes_filter: Lista de IDs de clases a detectar
+
+        Returns:
+            Lista de detecciones del frame
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_InferRequest(model_path, image, classes_filter, future))
+        return await future
+
+    def _ensure_started(self):
+        """Inicia la tarea de batching (lazy, requiere loop corriendo)"""
+        if self._task is None or self._task.done():
+            # La cola se conserva: lo encolado antes de un reinicio se atiende
+            if self._queue is None:
+                self._queue = asyncio.Queue()
+            # Semáforo propio de cada arranque: los lotes de una tarea anterior
+            # (cancelados por stop) liberan el suyo, no el de la nueva
+            self._inflight = asyncio.Semaphore(self.max_inflight)
+            self._task = asyncio.create_task(self._run(self._inflight))
+
+    async def _run(self, inflight: asyncio.Semaphore):
+        """
+        Loop: arma lotes y los despacha al executor
+
+        Args:
+            inflight: Semáforo que limita los lotes en ejecución de esta tarea
+        """
+        batch: List[_InferRequest] = []
+        try:
+            while True:
+                await inflight.acquire()
+                batch = [await self._queue.get()]
+                self._drain_into(batch)
+
+                # Solo se espera si hay concurrencia real; un frame aislado sale ya
+                if 1 < len(batch) < self.max_batch and self.max_wait_s > 0:
+                    await asyncio.sleep(self.max_wait_s)
+                    self._drain_into(batch)
+
+                task = asyncio.create_task(self._dispatch(batch))
+                self._dispatching.add(task)
+                task.add_done_callback(partial(self._on_dispatch_done, inflight))
+                batch = []
+        except asyncio.CancelledError:
+            logger.debug("Batcher cancelado")
+            # Lote armado pero no despachado: nadie más lo va a resolver
+            self._fail(batch)
+            raise
+
+    def _on_dispatch_done(self, inflight: asyncio.Semaphore, task: asyncio.Task):
+        """Libera el cupo de ejecución y la referencia al lote terminado"""
+        self._dispatching.discard(task)
+        inflight.release()
+
+    def _drain_into(self, batch: List[_InferRequest]):
+        """Mueve a batch los pedidos ya encolados (hasta max_batch)"""
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _dispatch(self, batch: List[_InferRequest]):
+        """Ejecuta un lote (agrupado por modelo) y resuelve los futures"""
+        loop = asyncio.get_running_loop()
+
+        groups: Dict[str, List[_InferRequest]] = defaultdict(list)
+        for req in batch:
+            if not req.future.done():
+                groups[req.model_path].append(req)
+
+        try:
+            for model_path, reqs in groups.items():
+                try:
+                    results = await loop.run_in_executor(
+                        self.executor,
+                        self.model_manager.infer_batch,
+                        model_path,
+                        [req.image for req in reqs],
+                        [req.classes_filter for req in reqs],
+                    )
+                except Exception as e:
+                    self._fail(reqs, e)
+                    continue
+
+                for req, detections in zip(reqs, results):
+                    if not req.future.done():
+                        req.future.set_result(detections)
+        finally:
+            # Cancelado (stop) a mitad del lote: resolver lo que quedó pendiente
+            self._fail(batch)
+
+        if len(batch) > 1:
+            logger.debug(f"Lote de inferencia: {len(batch)} frames")
+
+    @staticmethod
+    def _fail(reqs: List[_InferRequest], error: Optional[Exception] = None):
+        """Resuelve con error los pedidos que sigan pendientes"""
+        for req in reqs:
+            if not req.future.done():
+                req.future.set_exception(error or RuntimeError("Batcher detenido"))
+
+    def stop(self):
+        """Detiene la tarea de batching y falla los pedidos pendientes"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+        for task in list(self._dispatching):
+            task.cancel()
+
+        pending: List[_InferRequest] = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._fail(pending)
@@ -9,6 +9,10 @@ from ..inference.yolo11 import YOLO11Model, Detection
 
 logger = setup_logger("pipeline.model_manager")
 
+# Precisiones soportadas → sufijo de la variante exportada junto al modelo base
+# (p.ej. yolo11s.onnx → yolo11s.int8.onnx, ver finetuning/scripts/06_quantize_int8.py)
+PRECISION_SUFFIXES = {"fp32": "", "fp16": ".fp16", "int8": ".int8"}
+
 
 class ModelManager:
     """Administra instancias de modelos YOLO11 con pooling"""
@@ -18,17 +22,71 @@ class ModelManager:
         conf_threshold: float = 0.5,
         nms_iou: float = 0.6,
         class_names: Optional[List[str]] = None,
+        use_tensorrt: bool = True,
+        trt_fp16: bool = True,
+        trt_cache_dir: str = "/tmp/trt_cache",
+        idle_unload_s: float = 300.0,
+        precision: str = "fp32",
+        max_batch: int = 8,
+        fused_preprocess: bool = False,
     ):
         """
         Args:
             conf_threshold: Umbral de confianza por defecto
             nms_iou: Umbral IoU para NMS por defecto
+            class_names: Catálogo de clases
+            use_tensorrt: Usar TensorRT si está disponible
+            trt_fp16: Habilitar FP16 en TensorRT
+            trt_cache_dir: Directorio de cache de engines TensorRT
+            idle_unload_s: Segundos sin referencias antes de descargar un modelo
+                (0 = nunca descargar)
+            precision: Variante preferida del modelo (fp32, fp16 o int8)
+            max_batch: Lote máximo del batcher (perfil de shapes TensorRT)
+            fused_preprocess: Normalizar la entrada dentro del grafo ONNX
         """
         self.conf_threshold = conf_threshold
         self.nms_iou = nms_iou
         self.class_names = class_names
+        self.use_tensorrt = use_tensorrt
+        self.trt_fp16 = trt_fp16
+        self.trt_cache_dir = trt_cache_dir
+        self.idle_unload_s = idle_unload_s
+        if precision not in PRECISION_SUFFIXES:
+            logger.warning(f"Precisión desconocida '{precision}', se usa fp32")
+            precision = "fp32"
+        self.precision = precision
+        self.max_batch = max_batch
+        self.fused_preprocess = fused_preprocess
         self._models: Dict[str, YOLO11Model] = {}
         self._loading_tasks: Dict[str, asyncio.Task] = {}
+        self._refcounts: Dict[str, int] = {}
+        self._unload_tasks: Dict[str, asyncio.Task] = {}
+
+    def resolve_path(self, model_path: str) -> str:
+        """
+        Resuelve la variante del modelo según la precisión configurada
+
+        Si no existe el archivo de la variante se usa el modelo pedido tal cual.
+
+        Args:
+            model_path: Ruta al modelo ONNX pedido por el cliente
+
+        Returns:
+            Ruta al modelo a cargar
+        """
+        suffix = PRECISION_SUFFIXES[self.precision]
+        path = Path(model_path)
+        if not suffix or path.suffix != ".onnx" or path.stem.endswith(suffix):
+            return model_path
+
+        variant = path.with_name(f"{path.stem}{suffix}{path.suffix}")
+        if variant.exists():
+            return str(variant)
+
+        logger.warning(
+            f"No existe variante {self.precision} ({variant}), se usa {model_path}"
+        )
+        return model_path
 
     async def load(self, model_path: str) -> YOLO11Model:
         """
@@ -67,18 +125,89 @@ class ModelManager:
         finally:
             self._loading_tasks.pop(model_path, None)
 
+    async def acquire(self, model_path: str) -> YOLO11Model:
+        """
+        Carga (o reutiliza) un modelo y registra una referencia sobre él
+
+        Cada acquire debe corresponderse con un release.
+
+        Args:
+            model_path: Ruta al modelo ONNX
+
+        Returns:
+            Instancia del modelo cargado
+        """
+        model = await self.load(model_path)
+        model_path = str(Path(model_path).resolve())
+
+        self._refcounts[model_path] = self._refcounts.get(model_path, 0) + 1
+
+        # Si estaba programada su descarga, cancelarla
+        unload_task = self._unload_tasks.pop(model_path, None)
+        if unload_task and not unload_task.done():
+            unload_task.cancel()
+            logger.info(f"Descarga por inactividad cancelada: {model_path}")
+
+        return model
+
+    def release(self, model_path: str):
+        """
+        Libera una referencia; sin referencias, programa la descarga diferida
+
+        Args:
+            model_path: Ruta al modelo
+        """
+        model_path = str(Path(model_path).resolve())
+        count = self._refcounts.get(model_path, 0) - 1
+        if count > 0:
+            self._refcounts[model_path] = count
+            return
+
+        self._refcounts.pop(model_path, None)
+        if self.idle_unload_s > 0 and model_path in self._models:
+            logger.info(
+                f"Modelo sin referencias, se descargará en {self.idle_unload_s:.0f}s: {model_path}"
+            )
+            self._unload_tasks[model_path] = asyncio.create_task(
+                self._delayed_unload(model_path)
+            )
+
+    async def _delayed_unload(self, model_path: str):
+        """Descarga el modelo si sigue sin referencias tras el timeout"""
+        try:
+            await asyncio.sleep(self.idle_unload_s)
+        except asyncio.CancelledError:
+            return
+
+        self._unload_tasks.pop(model_path, None)
+        if self._refcounts.get(model_path, 0) == 0:
+            self.unload(model_path)
+
     async def _load_model(self, model_path: str) -> YOLO11Model:
         """Carga el modelo en un thread separado"""
         try:
-            model = await asyncio.to_thread(
-                YOLO11Model, model_path, self.class_names
-            )
+            model = await asyncio.to_thread(self._create_model, model_path)
             logger.info(f"Modelo cargado exitosamente: {model_path}")
             return model
         except Exception as e:
             logger.error(f"Error cargando modelo {model_path}: {e}")
             raise
 
+    def _create_model(self, model_path: str) -> YOLO11Model:
+        """Construye el modelo y lo precalienta (bloqueante, corre en thread)"""
+        model = YOLO11Model(
+            model_path,
+            self.class_names,
+            use_tensorrt=self.use_tensorrt,
+            trt_fp16=self.trt_fp16,
+            trt_cache_dir=self.trt_cache_dir,
+            max_batch=self.max_batch,
+            fused_preprocess=self.fused_preprocess,
+        )
+        # Evita que la primera inferencia real pague la inicialización del provider
+        model.warmup()
+        return model
+
     def get(self, model_path: str) -> Optional[YOLO11Model]:
         """
         Obtiene un modelo del pool (sin cargar)
@@ -127,6 +256,41 @@ class ModelManager:
             classes_filter=classes_filter,
         )
 
+    def infer_batch(
+        self,
+        model_path: str,
+        images: list,
+        classes_filters: Optional[List[Optional[List[int]]]] = None,
+        conf_thres: Optional[float] = None,
+        nms_iou: Optional[float] = None,
+    ) -> List[List[Detection]]:
+        """
+        Ejecuta inferencia sobre un lote de imágenes con un modelo del pool
+
+        Args:
+            model_path: Ruta al modelo
+            images: Imágenes BGR (HxWx3)
+            classes_filters: Filtro de clases por imagen
+            conf_thres: Umbral de confianza (usa default si es None)
+            nms_iou: Umbral IoU para NMS (usa default si es None)
+
+        Returns:
+            Lista de detecciones por imagen
+
+        Raises:
+            ValueError: Si el modelo no está cargado
+        """
+        model = self.get(model_path)
+        if model is None:
+            raise ValueError(f"Modelo no cargado: {model_path}")
+
+        return model.infer_batch(
+            images,
+            conf_thres=conf_thres or self.conf_threshold,
+            nms_iou=nms_iou or self.nms_iou,
+            classes_filters=classes_filters,
+        )
+
     def unload(self, model_path: str):
         """
         Descarga un modelo del pool
@@ -141,6 +305,11 @@ class ModelManager:
 
     def clear(self):
         """Descarga todos los modelos del pool"""
+        for task in self._unload_tasks.values():
+            task.cancel()
+        self._unload_tasks.clear()
+        self._refcounts.clear()
+
         count = len(self._models)
         self._models.clear()
         logger.info(f"Pool de modelos limpiado ({count} modelos)")
@@ -1,12 +1,16 @@
 """Procesador de pipeline - Orquesta decode → inferencia → tracking → persistencia"""
 
-from typing import Optional, List
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Optional, List, Tuple
 import numpy as np
 
 from ..core.logger import setup_logger
 from .dto import FramePayload, FrameResult, Detection
 from .frame_decoder import FrameDecoder
 from .model_manager import ModelManager
+from .inference_batcher import InferenceBatcher
 from .tracking_service import TrackingService
 from .session_service import SessionService
 
@@ -23,6 +27,8 @@ class FrameProcessor:
         tracking_service: TrackingService,
         session_service: SessionService,
         class_filter_ids: Optional[List[int]] = None,
+        decode_executor: Optional[Executor] = None,
+        batcher: Optional[InferenceBatcher] = None,
     ):
         """
         Args:
@@ -31,16 +37,28 @@ class FrameProcessor:
             tracking_service: Servicio de tracking
             session_service: Servicio de sesiones
             class_filter_ids: Lista de IDs de clases a filtrar
+            decode_executor: Pool donde se decodifican los frames (None = default del loop)
+            batcher: Batcher de inferencia compartido (se crea uno propio si es None)
         """
         self.decoder = decoder
         self.model_manager = model_manager
         self.tracking_service = tracking_service
         self.session_service = session_service
         self.class_filter_ids = class_filter_ids
+        self.decode_executor = decode_executor
+        self.batcher = batcher or InferenceBatcher(model_manager)
 
         self.current_model_path: Optional[str] = None
         self.frame_idx = 0
 
+        # Último session_id crudo recibido y su versión normalizada
+        self._session_cache: Tuple[Optional[str], Optional[str]] = (None, None)
+
+        # Buffer BGR de la conexión para frames NV12/I420 (crece si hace falta).
+        # Es seguro reutilizarlo: la conexión procesa un frame a la vez y, tras la
+        # inferencia, de la imagen solo se usa su tamaño
+        self._bgr_scratch = np.empty(0, dtype=np.uint8)
+
     def set_class_filter(self, class_ids: Optional[List[int]]):
         """
         Actualiza el filtro de clases activo
@@ -56,7 +74,7 @@ class FrameProcessor:
         else:
             logger.info("Filtro de clases deshabilitado (todas las clases)")
 
-    def process_frame(self, payload: FramePayload) -> Optional[FrameResult]:
+    async def process_frame(self, payload: FramePayload) -> Optional[FrameResult]:
         """
         Procesa un frame completo: decode → inferencia → tracking → persistencia
 
@@ -67,15 +85,19 @@ class FrameProcessor:
             FrameResult con detecciones o None si hay error
         """
         # 1. Gestionar sesión
-        session_changed = self._manage_session(payload.session_id)
+        session_changed = await self._manage_session(payload.session_id)
 
-        # 2. Decodificar frame
-        img = self.decoder.decode(
+        # 2. Decodificar frame fuera del event loop (OpenCV libera el GIL)
+        loop = asyncio.get_running_loop()
+        img = await loop.run_in_executor(
+            self.decode_executor,
+            self.decoder.decode,
             payload.data,
             payload.codec,
             payload.pixel_format,
             payload.width,
             payload.height,
+            self._bgr_buffer,
         )
 
         if img is None:
@@ -90,13 +112,14 @@ class FrameProcessor:
             return None
 
         try:
-            detections = self.model_manager.infer(
+            # Se agrupa con frames de otras conexiones y corre fuera del event loop
+            detections = await self.batcher.submit(
                 self.current_model_path, img, classes_filter=self.class_filter_ids
             )
 
-            # Log informativo cuando hay detecciones
-            if detections:
-                logger.info(
+            # Log de detecciones (solo se formatea si DEBUG está activo)
+            if detections and logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
                     f"Detecciones: {len(detections)} objetos - {', '.join(set(d.class_name for d in detections))}"
                 )
 
@@ -125,39 +148,23 @@ class FrameProcessor:
                 ts_utc_ns=payload.ts_utc_ns,
             )
 
-        # 6. Construir resultado
-        result_detections = []
-
+        # 6. Construir resultado (argumentos posicionales: x1, y1, x2, y2,
+        # confidence, class_name, track_id; sin dicts intermedios)
         if tracking_active:
             # Usar tracks
-            for track in tracks:
-                x1, y1, x2, y2 = track.bbox
-                result_detections.append(
-                    Detection(
-                        x1=x1,
-                        y1=y1,
-                        x2=x2,
-                        y2=y2,
-                        confidence=track.confidence,
-                        class_name=track.class_name,
-                        track_id=str(track.track_id),
-                    )
+            result_detections = [
+                Detection(
+                    *track.bbox, track.confidence, track.class_name, str(track.track_id)
                 )
+                for track in tracks
+            ]
         else:
             # Usar detecciones directas
-            for idx, det in enumerate(detections):
-                x1, y1, x2, y2 = det.bbox
-                result_detections.append(
-                    Detection(
-                        x1=x1,
-                        y1=y1,
-                        x2=x2,
-                        y2=y2,
-                        confidence=det.confidence,
-                        class_name=det.class_name,
-                        track_id=f"det-{payload.frame_id}-{idx}",
-                    )
-                )
+            det_prefix = f"det-{payload.frame_id}-"
+            result_detections = [
+                Detection(*det.bbox, det.confidence, det.class_name, f"{det_prefix}{idx}")
+                for idx, det in enumerate(detections)
+            ]
 
         self.frame_idx += 1
 
@@ -170,7 +177,27 @@ class FrameProcessor:
             tracking_active=tracking_active,
         )
 
-    def _manage_session(self, session_id: Optional[str]) -> bool:
+    def _bgr_buffer(self, width: int, height: int) -> Optional[np.ndarray]:
+        """
+        Vista (height, width, 3) sobre el buffer BGR reutilizable
+
+        La invoca el decoder NV12/I420 tras validar el tamaño del frame.
+
+        Args:
+            width: Ancho del frame
+            height: Alto del frame
+
+        Returns:
+            Vista del buffer o None si las dimensiones no son válidas
+        """
+        size = width * height * 3
+        if size <= 0:
+            return None
+        if self._bgr_scratch.size < size:
+            self._bgr_scratch = np.empty(size, dtype=np.uint8)
+        return self._bgr_scratch[:size].reshape(height, width, 3)
+
+    async def _manage_session(self, session_id: Optional[str]) -> bool:
         """
         Gestiona el estado de la sesión
 
@@ -180,15 +207,25 @@ class FrameProcessor:
         Returns:
             True si cambió la sesión, False en caso contrario
         """
-        # Normalizar session_id
-        trimmed_session = (session_id or "").strip()
-        normalized_session = trimmed_session if trimmed_session else None
+        # Normalizar session_id (cacheado: cambia muy de vez en cuando)
+        raw_session, normalized_session = self._session_cache
+        if session_id != raw_session:
+            trimmed_session = (session_id or "").strip()
+            normalized_session = trimmed_session if trimmed_session else None
+            self._session_cache = (session_id, normalized_session)
+
+        # Caso común: frame de la sesión ya activa
+        if (
+            normalized_session is not None
+            and normalized_session == self.session_service.get_current_session_id()
+        ):
+            return False
 
         # Si no hay session_id, cerrar sesión activa
         if normalized_session is None:
             if self.session_service.is_active():
                 logger.info("Session ID vacío, finalizando sesión activa")
-                self.session_service.end()
+                await self.session_service.end()
                 self.tracking_service.reset()
                 self.frame_idx = 0
                 return True
@@ -198,14 +235,14 @@ class FrameProcessor:
         current = self.session_service.get_current_session_id()
         if current and current != normalized_session:
             logger.info(f"Cambio de sesión: {current} → {normalized_session}")
-            self.session_service.end()
+            await self.session_service.end()
             self.tracking_service.reset()
             self.frame_idx = 0
 
         # Si no hay sesión activa y no es una recién cerrada, iniciar nueva
         if not self.session_service.is_active():
             if not self.session_service.was_recently_closed(normalized_session):
-                success = self.session_service.start(normalized_session)
+                success = await self.session_service.start(normalized_session)
                 if success:
                     self.frame_idx = 0
                     return True
@@ -220,16 +257,26 @@ class FrameProcessor:
         """
         Establece el modelo activo para inferencia
 
+        Toma posesión de una referencia ya adquirida con ModelManager.acquire
+        y libera la del modelo anterior.
+
         Args:
             model_path: Ruta al modelo
         """
+        self.release_model()
         self.current_model_path = model_path
         logger.info(f"Modelo activo establecido: {model_path}")
 
-    def end_session(self):
+    def release_model(self):
+        """Libera la referencia al modelo activo (si hay)"""
+        if self.current_model_path is not None:
+            self.model_manager.release(self.current_model_path)
+            self.current_model_path = None
+
+    async def end_session(self):
         """Finaliza la sesión activa"""
         if self.session_service.is_active():
-            self.session_service.end()
+            await self.session_service.end()
             self.tracking_service.reset()
             self.frame_idx = 0
 
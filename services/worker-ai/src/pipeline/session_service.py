@@ -34,7 +34,7 @@ class SessionService:
         self.current_writer: Optional[SessionWriter] = None
         self.last_closed_session_id: Optional[str] = None
 
-    def start(self, session_id: str, fps: Optional[float] = None) -> bool:
+    async def start(self, session_id: str, fps: Optional[float] = None) -> bool:
         """
         Inicia una nueva sesión
 
@@ -51,7 +51,7 @@ class SessionService:
 
             # Si ya hay una sesión activa diferente, cerrarla
             if self.current_session_id and self.current_session_id != normalized_id:
-                self.end()
+                await self.end()
 
             # Si es la misma sesión, no hacer nada
             if self.current_session_id == normalized_id:
@@ -107,11 +107,11 @@ class SessionService:
             ts_utc_ns=ts_utc_ns,
         )
 
-    def end(self):
-        """Finaliza la sesión activa"""
+    async def end(self):
+        """Finaliza la sesión activa (el I/O de cierre corre fuera del event loop)"""
         if self.current_session_id:
             try:
-                self.manager.end_session(self.current_session_id)
+                await self.manager.end_session_async(self.current_session_id)
                 logger.info(f"Sesión finalizada: {self.current_session_id}")
                 self.last_closed_session_id = self.current_session_id
             except Exception as e:
@@ -53,12 +53,8 @@ class TrackingService:
 
         all_tracks = self.tracker.update(detections)
 
-        # Filtrar solo tracks activos en este frame
-        active_tracks = [
-            t for t in all_tracks if (self.tracker.frame_idx - t.last_seen_frame) == 0
-        ]
-
-        return active_tracks
+        # Filtrar solo tracks activos en este frame (máscara sobre el estado SoA)
+        return [all_tracks[i] for i in self.tracker.active_indices()]
 
     def reset(self):
         """Resetea el tracker (para nueva sesión)"""
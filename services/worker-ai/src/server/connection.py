@@ -1,16 +1,20 @@
 """Manejador de conexiones TCP - Coordina servicios del pipeline"""
 
 import asyncio
-from typing import List, Optional, Tuple
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
 
 import ai_pb2 as pb
 
 from ..core.logger import setup_logger
 from ..config.runtime import RuntimeConfig
-from ..pipeline.dto import FramePayload
+from ..pipeline.dto import Detection, FramePayload, FrameResult
 from ..pipeline.processor import FrameProcessor
-from ..transport.framing import FrameReader, FrameWriter
-from ..transport.protobuf_codec import ProtobufCodec
+from ..tracking.botsort import Track
+from ..transport.framing import FrameProtocol, FrameReader, FrameWriter
+from ..transport.protobuf_codec import EnvelopeData, ProtobufCodec
 from ..visualization.viewer import Visualizer
 from .heartbeat import HeartbeatTask
 from .model_loader import ModelLoadJob
@@ -21,39 +25,42 @@ logger = setup_logger("server.connection")
 class ConnectionHandler:
     """Maneja una conexión de cliente - Coordina codec, pipeline y visualización"""
 
+    # Resultados recientes guardados para responder frames reenviados
+    RESULT_CACHE_SIZE = 16
+    # Intervalo del resumen periódico de frames procesados
+    STATS_INTERVAL_S = 5.0
+
     def __init__(
         self,
-        reader: asyncio.StreamReader,
-        writer: asyncio.StreamWriter,
+        protocol: FrameProtocol,
         config: RuntimeConfig,
         processor: FrameProcessor,
     visualizer: Optional[Visualizer],
     class_catalog: List[str],
+        class_name_to_id: Mapping[str, int],
     ):
         """
         Args:
-            reader: StreamReader de asyncio
-            writer: StreamWriter de asyncio
+            protocol: Protocolo de la conexión (framing sobre el transporte)
             config: Configuración runtime
             processor: Procesador de pipeline
             visualizer: Visualizador (opcional)
             class_catalog: Catálogo de clases disponible (ordenado)
+            class_name_to_id: Índice nombre en minúsculas → ID (compartido, solo lectura)
         """
         self.config = config
         self.processor = processor
         self.visualizer = visualizer
         self.class_filter_override: Optional[List[int]] = None
         self.class_catalog = class_catalog
-        self.class_name_to_id = {
-            name.lower(): idx for idx, name in enumerate(self.class_catalog)
-        }
+        self.class_name_to_id = class_name_to_id
 
         # Transporte
-        self.frame_reader = FrameReader(reader, max_size=config.max_frame_size)
-        self.frame_writer = FrameWriter(writer)
+        self.frame_reader = FrameReader(protocol)
+        self.frame_writer = FrameWriter(protocol)
         self.codec = ProtobufCodec()
 
-        self.peer = writer.get_extra_info("peername")
+        self.peer = protocol.transport.get_extra_info("peername")
 
         # Tareas auxiliares
         self.model_loader = ModelLoadJob(
@@ -63,17 +70,44 @@ class ConnectionHandler:
         )
         self.heartbeat_task: Optional[HeartbeatTask] = None
 
+        # Dispatch por msg_type: (oneof de Request esperado, handler). Solo se
+        # usa si el contenido coincide; si no, se resuelve por el oneof
+        self._dispatch: Dict[
+            int, Tuple[Optional[str], Callable[[EnvelopeData], Awaitable[None]]]
+        ] = {
+            pb.MT_INIT: ("init", lambda env: self._handle_init(env.request.init)),
+            pb.MT_FRAME: ("frame", lambda env: self._handle_frame(env.request.frame)),
+            pb.MT_HEARTBEAT: (None, lambda env: self._send_heartbeat()),
+            pb.MT_END: (None, lambda env: self._handle_end()),
+        }
+
+        # Último frame procesado y resultados recientes (por sesión)
+        self._last_session_id: Optional[str] = None
+        self._last_frame_id = -1
+        self._result_cache: "OrderedDict[int, Tuple[List[Detection], str]]" = (
+            OrderedDict()
+        )
+
+        # Cierre ordenado (shutdown del servidor)
+        self._closing = False
+        self._closed = asyncio.Event()
+
         # DEBUG: Contador de frames recibidos
         self.frames_received_count = 0
         self.frames_processed_count = 0
         self.envelopes_received_count = 0
 
+        # Resumen periódico (reemplaza el log por frame)
+        self._stats_t0 = time.monotonic()
+        self._stats_frames = 0
+        self._stats_latency_s = 0.0
+
     async def handle(self):
         """Loop principal de la conexión"""
         logger.info(f"Cliente conectado: {self.peer}")
 
         try:
-            while True:
+            while not self._closing:
                 # Leer frame
                 frame_data = await self.frame_reader.read_frame()
                 if frame_data is None:
@@ -89,23 +123,25 @@ class ConnectionHandler:
                 self.envelopes_received_count += 1
 
                 # DEBUG: Log cada 25 envelopes
-                if self.envelopes_received_count % 25 == 0:
-                    logger.info(
+                if self.envelopes_received_count % 25 == 0 and logger.isEnabledFor(
+                    logging.DEBUG
+                ):
+                    logger.debug(
                         f"[DEBUG] Envelopes recibidos: {self.envelopes_received_count}, tipo: {envelope.msg_type}"
                     )
 
                 # Procesar según tipo de mensaje
-                if envelope.msg_type == pb.MT_END:
-                    logger.info(f"[DEBUG] Mensaje END recibido")
-                    await self._handle_end()
-                    continue
-
-                if envelope.request:
-                    has_frame = envelope.request.HasField("frame")
-                    has_init = envelope.request.HasField("init")
-                    logger.debug(
-                        f"[DEBUG] Request recibido: has_init={has_init}, has_frame={has_frame}"
+                route = self._dispatch.get(envelope.msg_type)
+                if route is not None and (
+                    route[0] is None
+                    or (
+                        envelope.request is not None
+                        and envelope.request.WhichOneof("kind") == route[0]
                     )
+                ):
+                    await route[1](envelope)
+                elif envelope.request:
+                    # msg_type desconocido o distinto del contenido: resolver por el oneof
                     await self._handle_request(envelope.request)
                 elif envelope.heartbeat:
                     await self._send_heartbeat()
@@ -119,6 +155,33 @@ class ConnectionHandler:
 
         finally:
             await self._cleanup()
+            self._closed.set()
+
+    async def drain(self):
+        """
+        Cierre ordenado: termina el envelope en curso, finaliza la sesión y
+        cierra la conexión sin leer más mensajes
+        """
+        self._closing = True
+        self.frame_reader.close()
+        await self._closed.wait()
+
+    @staticmethod
+    def _visualization_tracks(detections: List[Detection]) -> List[Track]:
+        """Convierte las detecciones con track_id real en tracks para dibujar"""
+        tracks = []
+        for det in detections:
+            if det.track_id and not det.track_id.startswith("det-"):
+                track = Track(
+                    track_id=int(det.track_id),
+                    class_id=0,  # No lo usamos en visualización
+                    class_name=det.class_name,
+                    confidence=det.confidence,
+                    bbox=(det.x1, det.y1, det.x2, det.y2),
+                    last_seen_frame=0,
+                )
+                tracks.append(track)
+        return tracks
 
     async def _handle_request(self, request: pb.Request):
         """Procesa un Request"""
@@ -166,6 +229,9 @@ class ConnectionHandler:
             await self._send_error(pb.BAD_MESSAGE, "Model path is empty")
             return
 
+        # Elegir la variante fp32/fp16/int8 según model.precision
+        model_path = self.processor.model_manager.resolve_path(model_path)
+
         # Aplicar filtro de clases enviado por el edge-agent (si corresponde)
         if len(init.classes_filter) > 0:
             class_ids, class_names, unknown = self._parse_classes_filter(
@@ -212,6 +278,7 @@ class ConnectionHandler:
         # Si el modelo ya está cargado, responder inmediatamente
         if self.processor.model_manager.get(model_path):
             logger.info(f"[DEBUG] Modelo ya cargado, reutilizando: {model_path}")
+            await self.processor.model_manager.acquire(model_path)
             self.processor.set_model(model_path)
             await self._send_init_ok()
             return
@@ -260,10 +327,11 @@ class ConnectionHandler:
         """Maneja mensaje Frame - Ejecuta pipeline de procesamiento"""
         self.frames_received_count += 1
 
-        # DEBUG: Log TODOS los frames recibidos
-        logger.info(
-            f"[FRAME] Frame recibido: id={frame_msg.frame_id}, session={frame_msg.session_id or 'none'}, size={len(frame_msg.data)} bytes, resolution={frame_msg.width}x{frame_msg.height}, format={frame_msg.pixel_format}, codec={frame_msg.codec}"
-        )
+        # DEBUG: Log de cada frame (solo se formatea si DEBUG está activo)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"[FRAME] Frame recibido: id={frame_msg.frame_id}, session={frame_msg.session_id or 'none'}, size={len(frame_msg.data)} bytes, resolution={frame_msg.width}x{frame_msg.height}, format={frame_msg.pixel_format}, codec={frame_msg.codec}"
+            )
 
         # Verificar que el modelo esté listo
         if self.processor.current_model_path is None:
@@ -273,7 +341,18 @@ class ConnectionHandler:
             await self._send_error(pb.MODEL_NOT_READY, "Model not initialized")
             return
 
-        # Construir payload
+        # Frame duplicado o fuera de orden (p.ej. reenvío tras un corte de red):
+        # no se decodifica ni infiere de nuevo
+        if (
+            frame_msg.session_id == self._last_session_id
+            and frame_msg.frame_id <= self._last_frame_id
+        ):
+            await self._handle_stale_frame(frame_msg.frame_id)
+            return
+
+        # Construir payload. Cada acceso a un campo bytes de protobuf devuelve
+        # una copia nueva: data se lee una sola vez, y solo para frames que se
+        # van a procesar (no para los rechazados arriba)
         payload = FramePayload(
             session_id=frame_msg.session_id,
             frame_id=frame_msg.frame_id,
@@ -286,15 +365,15 @@ class ConnectionHandler:
             ts_utc_ns=getattr(frame_msg, "ts_utc_ns", None) or None,
         )
 
-        logger.debug(
-            f"Frame recibido: session={payload.session_id}, frame_id={payload.frame_id}, size={len(frame_msg.data)} bytes"
-        )
-
         # Procesar frame
-        result = self.processor.process_frame(payload)
+        t_start = time.perf_counter()
+        result = await self.processor.process_frame(payload)
 
         if result is not None:
             self.frames_processed_count += 1
+            self._stats_frames += 1
+            self._stats_latency_s += time.perf_counter() - t_start
+            self._maybe_log_stats()
 
         if result is None:
             logger.warning(
@@ -304,68 +383,79 @@ class ConnectionHandler:
             return
 
         # Visualizar (si está habilitado) - MOSTRAR TODOS LOS FRAMES para debugging
+        # La decodificación, la conversión a tracks y el dibujado ocurren en el
+        # hilo del visualizador (los frames que descarta no cuestan nada acá)
         if self.visualizer:
-            img = self.processor.get_image_for_visualization(payload)
-            if img is not None:
-                # Convertir detecciones a tracks para visualización
-                from ..tracking.botsort import Track
-                import cv2
-
-                tracks = []
-                for det in result.detections:
-                    if det.track_id and not det.track_id.startswith("det-"):
-                        track = Track(
-                            track_id=int(det.track_id),
-                            class_id=0,  # No lo usamos en visualización
-                            class_name=det.class_name,
-                            confidence=det.confidence,
-                            bbox=(det.x1, det.y1, det.x2, det.y2),
-                            last_seen_frame=0,
-                        )
-                        tracks.append(track)
-
-                # DEBUG: Agregar info del frame en la imagen
-                info_text = f"Frame: {payload.frame_id} | Detections: {len(result.detections)} | Session: {payload.session_id or 'none'}"
-                cv2.putText(
-                    img,
-                    info_text,
-                    (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.7,
-                    (0, 255, 0),
-                    2,
-                )
+            detections = result.detections
 
-                # Mostrar frame (con o sin detecciones)
-                self.visualizer.show(img, tracks)
+            # DEBUG: Agregar info del frame en la imagen
+            info_text = f"Frame: {payload.frame_id} | Detections: {len(detections)} | Session: {payload.session_id or 'none'}"
 
-        # Enviar respuesta
-        detections_dict = [
-            {
-                "x1": det.x1,
-                "y1": det.y1,
-                "x2": det.x2,
-                "y2": det.y2,
-                "confidence": det.confidence,
-                "class_name": det.class_name,
-                "track_id": det.track_id or "",
-            }
-            for det in result.detections
-        ]
+            # Mostrar frame (con o sin detecciones)
+            self.visualizer.submit(
+                lambda: self.processor.get_image_for_visualization(payload),
+                lambda: self._visualization_tracks(detections),
+                info_text,
+            )
 
         # DEBUG: Log detecciones cada 25 frames
-        if self.frames_processed_count % 25 == 0:
-            classes_detected = [d["class_name"] for d in detections_dict]
-            logger.info(
-                f"[DEBUG] Enviando resultado: frame_id={result.frame_id}, detecciones={len(detections_dict)}, clases={classes_detected}"
+        if self.frames_processed_count % 25 == 0 and logger.isEnabledFor(logging.DEBUG):
+            classes_detected = [d.class_name for d in result.detections]
+            logger.debug(
+                f"[DEBUG] Enviando resultado: frame_id={result.frame_id}, detecciones={len(result.detections)}, clases={classes_detected}"
             )
 
-        await self._send_result(detections_dict, result.frame_id, result.session_id)
+        self._remember_result(frame_msg.session_id, result.frame_id, result)
+
+        # Enviar respuesta
+        await self._send_result(result.detections, result.frame_id, result.session_id)
+
+    def _maybe_log_stats(self):
+        """Loguea frames procesados y latencia media cada STATS_INTERVAL_S"""
+        now = time.monotonic()
+        elapsed = now - self._stats_t0
+        if elapsed < self.STATS_INTERVAL_S:
+            return
+
+        frames = self._stats_frames
+        logger.info(
+            f"{self.peer}: {frames} frames en {elapsed:.1f}s ({frames / elapsed:.1f} fps), "
+            f"latencia media {self._stats_latency_s / frames * 1000:.1f} ms"
+        )
+        self._stats_t0 = now
+        self._stats_frames = 0
+        self._stats_latency_s = 0.0
+
+    async def _handle_stale_frame(self, frame_id: int):
+        """Responde un frame ya visto: reenvía el resultado cacheado o informa error"""
+        cached = self._result_cache.get(frame_id)
+        if cached is not None:
+            detections, session_id = cached
+            logger.debug(f"Frame duplicado {frame_id}, reenviando resultado cacheado")
+            await self._send_result(detections, frame_id, session_id)
+            return
+
+        logger.warning(
+            f"Frame fuera de orden descartado: frame_id={frame_id} "
+            f"(último procesado: {self._last_frame_id})"
+        )
+        await self._send_error(pb.BAD_SEQUENCE, f"Stale frame_id={frame_id}")
+
+    def _remember_result(self, session_key: str, frame_id: int, result: FrameResult):
+        """Registra el último frame procesado y guarda su resultado en el LRU"""
+        if session_key != self._last_session_id:
+            self._result_cache.clear()
+            self._last_session_id = session_key
+
+        self._last_frame_id = frame_id
+        self._result_cache[frame_id] = (result.detections, result.session_id)
+        if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
 
     async def _handle_end(self):
         """Maneja mensaje End - Finaliza sesión"""
         logger.info("End recibido, finalizando sesión")
-        self.processor.end_session()
+        await self.processor.end_session()
 
     async def _send_init_ok(self):
         """Envía respuesta InitOk"""
@@ -390,7 +480,9 @@ class ConnectionHandler:
         except Exception as e:
             logger.error(f"[DEBUG] Error enviando InitOk: {e}", exc_info=True)
 
-    async def _send_result(self, detections: list, frame_id: int, session_id: str):
+    async def _send_result(
+        self, detections: List[Detection], frame_id: int, session_id: str
+    ):
         """Envía respuesta con detecciones"""
         try:
             data = self.codec.encode_result(detections, frame_id, session_id)
@@ -430,8 +522,9 @@ class ConnectionHandler:
             self.heartbeat_task.stop()
             await self.heartbeat_task.wait()
 
-        # Finalizar sesión
-        self.processor.end_session()
+        # Finalizar sesión y liberar referencia al modelo
+        await self.processor.end_session()
+        self.processor.release_model()
 
         # Cerrar conexión
         try:
@@ -25,6 +25,8 @@ class HeartbeatTask:
         self.interval_seconds = interval_seconds
         self.task: asyncio.Task = None
         self._running = False
+        # Señal de fin: despierta al loop apenas se llama stop()
+        self._stopped = asyncio.Event()
 
     def start(self, condition: Callable[[], bool]):
         """
@@ -38,6 +40,7 @@ class HeartbeatTask:
             return
 
         self._running = True
+        self._stopped.clear()
         self.task = asyncio.create_task(self._run(condition))
 
     async def _run(self, condition: Callable[[], bool]):
@@ -45,7 +48,14 @@ class HeartbeatTask:
         try:
             while condition() and self._running:
                 await self.send_heartbeat()
-                await asyncio.sleep(self.interval_seconds)
+                # Esperar el intervalo o la señal de fin (lo que ocurra primero)
+                try:
+                    await asyncio.wait_for(
+                        self._stopped.wait(), timeout=self.interval_seconds
+                    )
+                    return
+                except asyncio.TimeoutError:
+                    pass
         except asyncio.CancelledError:
             logger.debug("Heartbeat task cancelada")
             raise
@@ -55,10 +65,14 @@ class HeartbeatTask:
             self._running = False
 
     def stop(self):
-        """Detiene el envío de heartbeats"""
+        """
+        Detiene el envío de heartbeats
+
+        El loop termina apenas se señaliza, sin cancelar la tarea: un heartbeat
+        en curso se termina de escribir.
+        """
         self._running = False
-        if self.task and not self.task.done():
-            self.task.cancel()
+        self._stopped.set()
 
     async def wait(self):
         """Espera a que termine la tarea"""
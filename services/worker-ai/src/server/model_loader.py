@@ -47,7 +47,8 @@ class ModelLoadJob:
         """Carga el modelo y ejecuta callbacks"""
         try:
             logger.info(f"[DEBUG] Iniciando carga de modelo: {model_path}")
-            await self.model_manager.load(model_path)
+            # Referencia propia de la conexión: se libera vía FrameProcessor
+            await self.model_manager.acquire(model_path)
             logger.info(f"[DEBUG] Modelo cargado exitosamente: {model_path}")
 
             if self.on_success:
@@ -1,7 +1,13 @@
 """Servidor TCP principal del Worker AI"""
 
 import asyncio
-from typing import Optional
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Optional, Set
+
+import ai_pb2 as pb
 
 from ..core.logger import setup_logger
 from ..config.runtime import RuntimeConfig
@@ -10,8 +16,11 @@ from ..pipeline.model_manager import ModelManager
 from ..pipeline.tracking_service import TrackingService
 from ..pipeline.session_service import SessionService
 from ..pipeline.processor import FrameProcessor
+from ..pipeline.inference_batcher import InferenceBatcher
 from ..visualization.viewer import Visualizer
 from ..inference.yolo11 import DEFAULT_CLASS_NAMES
+from ..transport.framing import FrameProtocol, FrameWriter
+from ..transport.protobuf_codec import ProtobufCodec
 from .connection import ConnectionHandler
 
 logger = setup_logger("server")
@@ -28,7 +37,19 @@ class WorkerServer:
         self.config = config
 
         # Inicializar componentes del pipeline
-        self.decoder = FrameDecoder()
+        self.decoder = FrameDecoder(
+            cuda_color=config.base_config.model.cuda_color_convert,
+            gpu_jpeg=config.base_config.model.gpu_jpeg_decode,
+        )
+        # Pool acotado para decodificación (compartido por todas las conexiones)
+        self.decode_pool = ThreadPoolExecutor(
+            max_workers=os.cpu_count() or 1, thread_name_prefix="decode"
+        )
+        # Pool de inferencia: permite solapar session.run de varias conexiones
+        self.infer_pool = ThreadPoolExecutor(
+            max_workers=max(1, config.base_config.model.infer_workers),
+            thread_name_prefix="infer",
+        )
 
         catalog = config.base_config.model.class_catalog
         if catalog:
@@ -50,6 +71,22 @@ class WorkerServer:
             conf_threshold=config.base_config.model.conf_threshold,
             nms_iou=config.base_config.model.nms_iou,
             class_names=self.class_catalog,
+            use_tensorrt=config.base_config.model.use_tensorrt,
+            trt_fp16=config.base_config.model.trt_fp16,
+            trt_cache_dir=config.base_config.model.trt_cache_dir,
+            idle_unload_s=config.base_config.model.idle_unload_s,
+            precision=config.base_config.model.precision,
+            max_batch=config.base_config.model.max_batch,
+            fused_preprocess=config.base_config.model.fused_preprocess,
+        )
+
+        # Micro-batching de inferencia entre conexiones
+        self.batcher = InferenceBatcher(
+            self.model_manager,
+            executor=self.infer_pool,
+            max_batch=config.base_config.model.max_batch,
+            max_wait_ms=config.base_config.model.batch_wait_ms,
+            max_inflight=config.base_config.model.infer_workers,
         )
 
         self.tracking_service = TrackingService(
@@ -64,17 +101,19 @@ class WorkerServer:
             segment_duration_s=config.base_config.sessions.segment_duration_s,
         )
 
+        # Índice nombre → ID del catálogo (constante, compartido por las conexiones)
+        self.class_name_to_id = MappingProxyType(
+            {name.lower(): i for i, name in enumerate(self.class_catalog)}
+        )
+
         # Filtro de clases
         class_filter_ids = None
         if config.base_config.model.classes:
-            class_name_to_id = {
-                name.lower(): i for i, name in enumerate(self.class_catalog)
-            }
             resolved_ids = []
             unknown_classes = []
             for raw_name in config.base_config.model.classes:
                 key = raw_name.lower()
-                class_id = class_name_to_id.get(key)
+                class_id = self.class_name_to_id.get(key)
                 if class_id is None:
                     unknown_classes.append(raw_name)
                     continue
@@ -100,6 +139,14 @@ class WorkerServer:
         self.visualizer: Optional[Visualizer] = None
         self.visualization_enabled = config.base_config.visualization.enabled
 
+        # Límite de conexiones simultáneas
+        self.max_connections = max(1, config.base_config.server.max_connections)
+        self._conn_sem = asyncio.Semaphore(self.max_connections)
+
+        # Conexiones activas y señal de cierre ordenado
+        self.connections: Set[ConnectionHandler] = set()
+        self._closing = asyncio.Event()
+
     def _get_visualizer(self) -> Optional[Visualizer]:
         """Obtiene visualizador (lazy init)"""
         if not self.visualization_enabled:
@@ -138,38 +185,77 @@ class WorkerServer:
             tracking_service=tracking,
             session_service=session,
             class_filter_ids=self.class_filter_ids,
+            decode_executor=self.decode_pool,
+            batcher=self.batcher,
         )
 
-    async def handle_connection(
-        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
-    ):
+    async def handle_connection(self, protocol: FrameProtocol):
         """
         Callback para nueva conexión
 
         Args:
-            reader: StreamReader de asyncio
-            writer: StreamWriter de asyncio
+            protocol: Protocolo de la conexión (framing sobre el transporte)
         """
-        processor = self._create_processor()
-        visualizer = self._get_visualizer()
-
-        handler = ConnectionHandler(
-            reader,
-            writer,
-            self.config,
-            processor,
-            visualizer,
-            self.class_catalog,
-        )
+        if self._closing.is_set():
+            await self._reject_connection(protocol, "Server shutting down")
+            return
+
+        if self._conn_sem.locked():
+            logger.warning(
+                f"Límite de conexiones alcanzado ({self.max_connections}), "
+                f"rechazando {protocol.transport.get_extra_info('peername')}"
+            )
+            await self._reject_connection(protocol, "Server overloaded")
+            return
+
+        async with self._conn_sem:
+            processor = self._create_processor()
+            visualizer = self._get_visualizer()
+
+            handler = ConnectionHandler(
+                protocol,
+                self.config,
+                processor,
+                visualizer,
+                self.class_catalog,
+                self.class_name_to_id,
+            )
 
-        await handler.handle()
+            self.connections.add(handler)
+            try:
+                await handler.handle()
+            finally:
+                self.connections.discard(handler)
+
+    async def _reject_connection(self, protocol: FrameProtocol, reason: str):
+        """Envía un Error y cierra una conexión que no será atendida"""
+        frame_writer = FrameWriter(protocol)
+        try:
+            data = ProtobufCodec().encode_error(pb.INTERNAL, reason)
+            await frame_writer.write_frame(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            frame_writer.close()
+            try:
+                await frame_writer.wait_closed()
+            except Exception as err:
+                logger.debug("Error cerrando conexión rechazada: %s", err)
 
     async def run(self):
         """Inicia el servidor TCP"""
-        server = await asyncio.start_server(
-            self.handle_connection,
-            self.config.base_config.server.bind_host,
-            self.config.base_config.server.bind_port,
+        server_cfg = self.config.base_config.server
+        loop = asyncio.get_running_loop()
+        # Protocolo propio en lugar de StreamReader/StreamWriter: el framing se
+        # resuelve en los callbacks del transporte, sin un Future por lectura
+        server = await loop.create_server(
+            lambda: FrameProtocol(
+                self.handle_connection, max_size=self.config.max_frame_size
+            ),
+            server_cfg.bind_host,
+            server_cfg.bind_port,
+            backlog=server_cfg.backlog,
+            reuse_port=server_cfg.reuse_port,
         )
 
         host = self.config.base_config.server.bind_host
@@ -178,8 +264,41 @@ class WorkerServer:
         logger.info(f"🚀 Worker AI escuchando en {host}:{port}")
         logger.info(f"📁 Output tracks: {self.config.base_config.sessions.output_dir}")
 
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request_shutdown)
+            except (NotImplementedError, RuntimeError):  # pragma: no cover - p.ej. Windows
+                pass
+
         async with server:
-            await server.serve_forever()
+            await self._closing.wait()
+            logger.info("Shutdown solicitado, dejando de aceptar conexiones")
+            server.close()
+            await self._drain_connections()
+
+    def request_shutdown(self):
+        """Solicita el cierre ordenado del servidor (handler de señales)"""
+        self._closing.set()
+
+    async def _drain_connections(self):
+        """Espera a que las conexiones activas terminen su frame en curso y cierren"""
+        if not self.connections:
+            return
+
+        timeout = self.config.base_config.server.shutdown_timeout_s
+        logger.info(
+            f"Drenando {len(self.connections)} conexiones activas (timeout {timeout}s)"
+        )
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    *(handler.drain() for handler in list(self.connections)),
+                    return_exceptions=True,
+                ),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Timeout drenando conexiones, cerrando igualmente")
 
     def shutdown(self):
         """Limpieza al cerrar el servidor"""
@@ -190,4 +309,8 @@ class WorkerServer:
         if self.visualizer:
             self.visualizer.close()
 
+        self.batcher.stop()
+        self.decode_pool.shutdown(wait=False, cancel_futures=True)
+        self.infer_pool.shutdown(wait=False, cancel_futures=True)
+
         logger.info("Servidor cerrado")
@@ -2,9 +2,13 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
+import os
+import threading
 from dataclasses import dataclass, asdict, field
 from datetime import datetime, timezone
+from operator import attrgetter
 from pathlib import Path
 from typing import Dict, List, Optional
 
@@ -13,6 +17,24 @@ from ..tracking.botsort import Track
 
 logger = setup_logger("session")
 
+# Campos de Track persistidos (orden de las columnas del snapshot)
+_TRACK_FIELDS = attrgetter(
+    "track_id",
+    "class_id",
+    "class_name",
+    "confidence",
+    "bbox",
+    "kf",
+    "bbox_smooth",
+    "bbox_pred",
+    "velocity",
+    "age",
+    "hits",
+    "hit_streak",
+    "time_since_update",
+    "state",
+)
+
 
 def _isoformat_utc(dt: datetime) -> str:
     """Formatea fecha en ISO8601 con sufijo Z."""
@@ -60,6 +82,11 @@ class SessionMeta:
 class SessionWriter:
     """Gestiona archivos de tracking para una sesión."""
 
+    # Ventana de acumulación antes de escribir un lote a disco
+    FLUSH_INTERVAL_S = 0.5
+    # Máximo de frames escritos por lote
+    MAX_BATCH = 64
+
     def __init__(
         self,
         session_id: str,
@@ -100,6 +127,13 @@ class SessionWriter:
 
         self.device_id = session_id.split("_", 2)[1] if "_" in session_id else "unknown"
 
+        # Escritura diferida: write_frame encola, una tarea de fondo persiste
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._inflight: List[tuple] = []  # lote tomado de la cola, aún no escrito
+        # Serializa el I/O del hilo de escritura con finalize()
+        self._io_lock = threading.Lock()
+
         logger.info(
             "Sesión iniciada: %s -> %s (segmento=%.1fs)",
             session_id,
@@ -123,7 +157,7 @@ class SessionWriter:
         ts_mono_ns: Optional[int] = None,
         ts_utc_ns: Optional[int] = None,
     ) -> None:
-        """Persiste tracks de un frame dentro del segmento correspondiente.
+        """Persiste tracks de un frame dentro del segmento correspondiente (diferido).
 
         Args:
             tracks: Lista de tracks detectados
@@ -170,7 +204,6 @@ class SessionWriter:
             t_rel_s = 0.0
 
         segment_index = int(t_rel_s // self.segment_duration_s)
-        segment = self._ensure_segment(segment_index)
 
         self.frame_count += 1
         self.latest_frame_idx = max(self.latest_frame_idx, frame_idx)
@@ -180,99 +213,59 @@ class SessionWriter:
         if frame_height:
             self.video_height = frame_height
 
-        objs = []
-        for track in tracks:
-            self.classes_seen[track.class_id] = track.class_name
-            x1, y1, x2, y2 = track.bbox
-            
-            # Base object (v1 - backward compatible)
-            obj = {
-                "track_id": track.track_id,
-                "cls": track.class_id,
-                "cls_name": track.class_name,
-                "conf": round(track.confidence, 4),
-                "bbox_xyxy": [
-                    round(x1, 4),
-                    round(y1, 4),
-                    round(x2, 4),
-                    round(y2, 4),
-                ],
-            }
-            
-            # Extended metadata (v2 - optional)
-            # Solo agregar si hay datos de Kalman Filter
-            if track.kf is not None:
-                kf_state = {}
-                
-                # Bbox suavizado
-                if track.bbox_smooth:
-                    sx1, sy1, sx2, sy2 = track.bbox_smooth
-                    kf_state["bbox_smooth"] = [
-                        round(sx1, 4),
-                        round(sy1, 4),
-                        round(sx2, 4),
-                        round(sy2, 4),
-                    ]
-                
-                # Bbox predicho
-                if track.bbox_pred:
-                    px1, py1, px2, py2 = track.bbox_pred
-                    kf_state["bbox_pred"] = [
-                        round(px1, 4),
-                        round(py1, 4),
-                        round(px2, 4),
-                        round(py2, 4),
-                    ]
-                
-                # Velocidad
-                if track.velocity:
-                    vx, vy = track.velocity
-                    kf_state["velocity"] = [round(vx, 4), round(vy, 4)]
-                
-                if kf_state:
-                    obj["kf_state"] = kf_state
-            
-            # Track metadata
-            if track.age > 0 or track.hits > 0:
-                obj["track_meta"] = {
-                    "age": track.age,
-                    "hits": track.hits,
-                    "hit_streak": track.hit_streak,
-                    "time_since_update": track.time_since_update,
-                    "state": track.state,
-                }
-            
-            objs.append(obj)
+        # Snapshot columnar de los tracks (una lectura de atributos por track);
+        # los objetos JSON se arman en el hilo de escritura
+        snapshot = tuple(zip(*map(_TRACK_FIELDS, tracks)))
 
         event = {
             "t_rel_s": round(t_rel_s, 3),
             "frame": frame_idx,
             "ts_mono_ns": ts_mono_ns,
             "ts_utc_ns": ts_utc_ns,
-            "objs": objs,
         }
 
-        if self.current_segment_fp is None:
-            raise RuntimeError("Segmento activo no inicializado antes de escribir")
-
-        self.current_segment_fp.write(json.dumps(event, ensure_ascii=True) + "\n")
-        self.current_segment_fp.flush()
-
-        segment["count"] = int(segment.get("count", 0)) + 1
-
-        self._write_index()
-        self._write_meta()
+        self._enqueue(segment_index, event, snapshot)
 
     def finalize(self) -> None:
-        """Cierra archivos y escribe metadata final."""
-        if self.latest_utc_ns is not None:
-            self.end_time = _ns_to_iso(self.latest_utc_ns)
-        else:
-            self.end_time = _utcnow_iso()
-        self._close_current_segment(mark_closed=True)
+        """Cierra archivos y escribe metadata final (bloqueante, p.ej. shutdown)."""
+        self._stop_writer_task()
+        self._finalize_io(self._drain_queue())
+
+    async def finalize_async(self) -> None:
+        """Como finalize(), pero el drenado, fsync y metadata corren en el executor."""
+        self._stop_writer_task()
+        # La cola (asyncio) se vacía en el loop; el I/O va al hilo de escritura
+        queued = self._drain_queue()
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._finalize_io, queued
+        )
 
-        self._write_index()
-        self._write_meta()
+    # --------------------------------------------------------------------- #
+    # Helpers internos
+    # --------------------------------------------------------------------- #
+    def _drain_queue(self) -> List[tuple]:
+        """Saca los eventos encolados que la tarea de escritura no llegó a tomar."""
+        queued = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                queued.append(self._queue.get_nowait())
+        return queued
+
+    def _finalize_io(self, queued: List[tuple]) -> None:
+        """Persiste lo pendiente y cierra la sesión en disco."""
+        # Si hay un lote escribiéndose en el hilo de I/O, se espera a que termine
+        with self._io_lock:
+            pending, self._inflight = self._inflight, []
+            self._write_batch(pending + queued)
+
+            if self.latest_utc_ns is not None:
+                self.end_time = _ns_to_iso(self.latest_utc_ns)
+            else:
+                self.end_time = _utcnow_iso()
+            self._close_current_segment(mark_closed=True, sync=True)
+
+            self._write_index()
+            self._write_meta()
 
         logger.info(
             "Sesión finalizada: %s (%d frames con tracks)",
@@ -280,9 +273,127 @@ class SessionWriter:
             self.frame_count,
         )
 
-    # --------------------------------------------------------------------- #
-    # Helpers internos
-    # --------------------------------------------------------------------- #
+    def _enqueue(self, segment_index: int, event: dict, snapshot: tuple) -> None:
+        """Encola un evento para la tarea de escritura (o escribe si no hay loop)."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Sin event loop (uso fuera del servidor): escritura directa
+            self._write_batch([(segment_index, event, snapshot)])
+            return
+
+        if self._writer_task is None:
+            self._queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+        self._queue.put_nowait((segment_index, event, snapshot))
+
+    async def _writer_loop(self) -> None:
+        """Acumula eventos durante FLUSH_INTERVAL_S y los escribe en lote."""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._inflight = [await self._queue.get()]
+            await asyncio.sleep(self.FLUSH_INTERVAL_S)
+            while len(self._inflight) < self.MAX_BATCH and not self._queue.empty():
+                self._inflight.append(self._queue.get_nowait())
+            try:
+                # Serialización JSON y escritura (segmento + index/meta) fuera del loop
+                await loop.run_in_executor(None, self._write_inflight)
+            except Exception as e:
+                logger.error("Error persistiendo tracks de %s: %s", self.session_id, e)
+                self._inflight = []
+
+    def _write_inflight(self) -> None:
+        """Escribe el lote en curso (corre en un hilo del executor)."""
+        with self._io_lock:
+            # Tomar el lote bajo el lock: si finalize() ya lo escribió, queda vacío
+            batch, self._inflight = self._inflight, []
+            self._write_batch(batch)
+
+    def _stop_writer_task(self) -> None:
+        """Detiene la tarea de escritura (los eventos pendientes quedan en la cola)."""
+        if self._writer_task is not None and not self._writer_task.done():
+            self._writer_task.cancel()
+        self._writer_task = None
+
+    def _write_batch(self, batch: List[tuple]) -> None:
+        """Escribe un lote de eventos y actualiza index/meta una sola vez."""
+        if not batch:
+            return
+
+        for segment_index, event, snapshot in batch:
+            event["objs"] = self._build_objs(snapshot)
+            segment = self._ensure_segment(segment_index)
+            if self.current_segment_fp is None:
+                raise RuntimeError("Segmento activo no inicializado antes de escribir")
+
+            self.current_segment_fp.write(json.dumps(event, ensure_ascii=True) + "\n")
+            segment["count"] = int(segment.get("count", 0)) + 1
+
+        if self.current_segment_fp:
+            self.current_segment_fp.flush()
+
+        self._write_index()
+        self._write_meta()
+
+    def _build_objs(self, snapshot: tuple) -> List[dict]:
+        """Arma los objetos JSON de un frame desde el snapshot columnar de tracks."""
+        (
+            track_ids,
+            class_ids,
+            class_names,
+            confidences,
+            bboxes,
+            kfs,
+            bboxes_smooth,
+            bboxes_pred,
+            velocities,
+            ages,
+            hits,
+            hit_streaks,
+            times_since_update,
+            states,
+        ) = snapshot
+
+        self.classes_seen.update(zip(class_ids, class_names))
+
+        objs = []
+        for i, (x1, y1, x2, y2) in enumerate(bboxes):
+            # Base object (v1 - backward compatible)
+            obj = {
+                "track_id": track_ids[i],
+                "cls": class_ids[i],
+                "cls_name": class_names[i],
+                "conf": round(confidences[i], 4),
+                "bbox_xyxy": [round(x1, 4), round(y1, 4), round(x2, 4), round(y2, 4)],
+            }
+
+            # Extended metadata (v2 - optional)
+            # Solo agregar si hay datos de Kalman Filter
+            if kfs[i] is not None:
+                kf_state = {}
+                if bboxes_smooth[i]:
+                    kf_state["bbox_smooth"] = [round(v, 4) for v in bboxes_smooth[i]]
+                if bboxes_pred[i]:
+                    kf_state["bbox_pred"] = [round(v, 4) for v in bboxes_pred[i]]
+                if velocities[i]:
+                    kf_state["velocity"] = [round(v, 4) for v in velocities[i]]
+                if kf_state:
+                    obj["kf_state"] = kf_state
+
+            # Track metadata
+            if ages[i] > 0 or hits[i] > 0:
+                obj["track_meta"] = {
+                    "age": ages[i],
+                    "hits": hits[i],
+                    "hit_streak": hit_streaks[i],
+                    "time_since_update": times_since_update[i],
+                    "state": states[i],
+                }
+
+            objs.append(obj)
+        return objs
+
     def _ensure_segment(self, index: int) -> Dict[str, object]:
         """Abre (o reutiliza) el archivo del segmento indicado."""
         if self.current_segment_index == index and self.current_segment_fp:
@@ -313,10 +424,12 @@ class SessionWriter:
 
         return segment
 
-    def _close_current_segment(self, mark_closed: bool) -> None:
-        """Cierra el archivo del segmento activo."""
+    def _close_current_segment(self, mark_closed: bool, sync: bool = False) -> None:
+        """Cierra el archivo del segmento activo (con fsync si sync=True)."""
         if self.current_segment_fp:
             self.current_segment_fp.flush()
+            if sync:
+                os.fsync(self.current_segment_fp.fileno())
             self.current_segment_fp.close()
 
         if mark_closed and self.current_segment_index is not None:
@@ -457,6 +570,12 @@ class SessionManager:
         if writer:
             writer.finalize()
 
+    async def end_session_async(self, session_id: str) -> None:
+        """Finaliza una sesión sin bloquear el event loop con el I/O de cierre."""
+        writer = self.active_sessions.pop(session_id, None)
+        if writer:
+            await writer.finalize_async()
+
     def end_all_sessions(self) -> None:
         """Cierra todas las sesiones activas (shutdown ordenado)."""
         for session_id in list(self.active_sessions.keys()):
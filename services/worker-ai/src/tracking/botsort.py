@@ -2,11 +2,19 @@
 
 from dataclasses import dataclass
 from typing import List, Dict, Tuple, Optional
+import numpy as np
 import yaml
 
 from ..core.logger import setup_logger
 from ..inference.yolo11 import Detection
-from .kalman_bbox import KalmanBBoxFilter
+from .kalman_bbox import KalmanBBoxFilter, predict_batch
+
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - numba es opcional
+    NUMBA_AVAILABLE = False
 
 logger = setup_logger("tracking")
 
@@ -34,6 +42,116 @@ def iou_xyxy(
     return inter / union
 
 
+def _iou_matrix_numpy(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU (N, M) entre dos arrays xyxy (N, 4) y (M, 4), vectorizado con numpy"""
+    inter_x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    inter_y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    inter_x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    inter_y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+
+    inter = np.maximum(0.0, inter_x2 - inter_x1) * np.maximum(0.0, inter_y2 - inter_y1)
+
+    area_a = np.maximum(0.0, a[:, 2] - a[:, 0]) * np.maximum(0.0, a[:, 3] - a[:, 1])
+    area_b = np.maximum(0.0, b[:, 2] - b[:, 0]) * np.maximum(0.0, b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter + 1e-6
+
+    return inter / union
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True)
+    def _iou_matrix_numba(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """IoU (N, M) compilado; misma fórmula que iou_xyxy"""
+        n = a.shape[0]
+        m = b.shape[0]
+        out = np.zeros((n, m), dtype=np.float64)
+        for i in range(n):
+            area_a = max(0.0, a[i, 2] - a[i, 0]) * max(0.0, a[i, 3] - a[i, 1])
+            for j in range(m):
+                iw = max(0.0, min(a[i, 2], b[j, 2]) - max(a[i, 0], b[j, 0]))
+                ih = max(0.0, min(a[i, 3], b[j, 3]) - max(a[i, 1], b[j, 1]))
+                inter = iw * ih
+                area_b = max(0.0, b[j, 2] - b[j, 0]) * max(0.0, b[j, 3] - b[j, 1])
+                out[i, j] = inter / (area_a + area_b - inter + 1e-6)
+        return out
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Calcula la matriz de IoU entre dos conjuntos de bboxes xyxy
+
+    Args:
+        a: Array (N, 4) float64
+        b: Array (M, 4) float64
+
+    Returns:
+        Array (N, M) con el IoU de cada par
+    """
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float64)
+    if NUMBA_AVAILABLE:
+        return _iou_matrix_numba(a, b)
+    return _iou_matrix_numpy(a, b)
+
+
+def _greedy_match_numpy(ious: np.ndarray, match_thresh: float) -> np.ndarray:
+    """Matching greedy en orden de detección (pone en 0 las columnas usadas)"""
+    matches = np.full(ious.shape[0], -1, dtype=np.int64)
+    if ious.shape[1] == 0:
+        return matches
+    for d in range(ious.shape[0]):
+        best = int(np.argmax(ious[d]))
+        best_iou = ious[d, best]
+        if best_iou > 0.0 and best_iou >= match_thresh:
+            matches[d] = best
+            ious[:, best] = 0.0
+    return matches
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True)
+    def _greedy_match_numba(ious: np.ndarray, match_thresh: float) -> np.ndarray:
+        """Matching greedy compilado; mismo desempate que np.argmax (primer máximo)"""
+        n = ious.shape[0]
+        m = ious.shape[1]
+        matches = np.full(n, -1, dtype=np.int64)
+        if m == 0:
+            return matches
+        for d in range(n):
+            best = 0
+            best_iou = ious[d, 0]
+            for j in range(1, m):
+                if ious[d, j] > best_iou:
+                    best = j
+                    best_iou = ious[d, j]
+            if best_iou > 0.0 and best_iou >= match_thresh:
+                matches[d] = best
+                for k in range(n):
+                    ious[k, best] = 0.0
+        return matches
+
+
+def greedy_match(ious: np.ndarray, match_thresh: float) -> np.ndarray:
+    """
+    Asocia cada detección (fila) con el track (columna) de mayor IoU
+
+    Recorre las detecciones en orden; un track matcheado no puede asociarse a
+    otra detección. Modifica ious in-place.
+
+    Args:
+        ious: Matriz (N, M) float64 de IoU detección-track
+        match_thresh: IoU mínimo para aceptar el match
+
+    Returns:
+        Array (N,) con el índice del track asignado o -1
+    """
+    if NUMBA_AVAILABLE:
+        return _greedy_match_numba(ious, float(match_thresh))
+    return _greedy_match_numpy(ious, match_thresh)
+
+
 @dataclass
 class Track:
     """Un track activo con Kalman Filter para suavizado"""
@@ -104,6 +222,13 @@ class BoTSORTTracker:
         self.tracks: List[Track] = []
         self.frame_idx = 0
 
+        # Estado en forma SoA, paralelo a self.tracks (mismo orden)
+        self.last_seen = np.empty(0, dtype=np.int32)
+
+    def active_indices(self) -> np.ndarray:
+        """Índices (en self.tracks) de los tracks vistos en el frame actual"""
+        return np.flatnonzero(self.last_seen == self.frame_idx)
+
     def update(self, detections: List[Detection]) -> List[Track]:
         """
         Actualiza el tracker con nuevas detecciones
@@ -118,20 +243,23 @@ class BoTSORTTracker:
 
         # Fase 1: Predicción para todos los tracks existentes
         if self.use_kalman:
-            for track in self.tracks:
-                if track.kf is not None:
-                    track.bbox_pred = track.kf.predict()
-                    track.velocity = track.kf.get_velocity()
-                    track.age = track.kf.age
-                    track.time_since_update = track.kf.time_since_update
+            kf_tracks = [track for track in self.tracks if track.kf is not None]
+            preds = predict_batch([track.kf for track in kf_tracks])
+            for track, pred in zip(kf_tracks, preds.tolist()):
+                track.bbox_pred = tuple(pred)
+                track.velocity = track.kf.get_velocity()
+                track.age = track.kf.age
+                track.time_since_update = track.kf.time_since_update
+
+        # Tracks todavía vivos (vectorizado sobre el estado SoA)
+        alive_idx = np.flatnonzero(
+            (self.frame_idx - self.last_seen) <= self.max_age
+        )
 
         if not detections:
             # Mantener tracks vivos (sin update)
-            self.tracks = [
-                t
-                for t in self.tracks
-                if (self.frame_idx - t.last_seen_frame) <= self.max_age
-            ]
+            self.tracks = [self.tracks[i] for i in alive_idx]
+            self.last_seen = self.last_seen[alive_idx]
             # Actualizar estado de tracks sin match
             for track in self.tracks:
                 track.hit_streak = 0
@@ -141,31 +269,30 @@ class BoTSORTTracker:
 
         matched_track_ids = set()
         updated_tracks = []
+        det_boxes = np.array([det.bbox for det in detections], dtype=np.float64)
 
         # Fase 2: Asociar detecciones con tracks existentes
-        for det in detections:
-            best_iou = 0.0
-            best_track_idx = -1
-
-            # Buscar mejor match con IoU + misma clase
-            # Usar bbox_pred si está disponible, sino bbox raw
-            for idx, track in enumerate(self.tracks):
-                if track.class_id != det.class_id:
-                    continue
-
-                if track.track_id in matched_track_ids:
-                    continue
-
-                # Usar predicción de Kalman si está disponible
-                compare_bbox = track.bbox_pred if track.bbox_pred else track.bbox
-                iou = iou_xyxy(compare_bbox, det.bbox)
-                
-                if iou > best_iou:
-                    best_iou = iou
-                    best_track_idx = idx
+        # IoU de todos los pares (det, track) en una sola pasada; se usa
+        # bbox_pred (Kalman) si está disponible, sino bbox raw. Los pares de
+        # distinta clase quedan en 0 y no pueden matchear.
+        ious = iou_matrix(
+            det_boxes,
+            np.array(
+                [t.bbox_pred if t.bbox_pred else t.bbox for t in self.tracks],
+                dtype=np.float64,
+            ).reshape(-1, 4),
+        )
+        if self.tracks:
+            det_classes = np.array([det.class_id for det in detections])
+            track_classes = np.array([t.class_id for t in self.tracks])
+            ious[det_classes[:, None] != track_classes[None, :]] = 0.0
+
+        # Matching greedy en orden de detección: primer track con IoU máximo
+        matches = greedy_match(ious, self.match_thresh).tolist()
 
+        for det, best_track_idx in zip(detections, matches):
             # Match encontrado
-            if best_iou >= self.match_thresh and best_track_idx >= 0:
+            if best_track_idx >= 0:
                 track = self.tracks[best_track_idx]
                 
                 # Actualizar con Kalman Filter
@@ -228,14 +355,23 @@ class BoTSORTTracker:
                 updated_tracks.append(new_track)
 
         # Fase 3: Mantener tracks no matcheados pero todavía vivos
-        for track in self.tracks:
+        kept_idx = []
+        for idx in alive_idx:
+            track = self.tracks[idx]
             if track.track_id not in matched_track_ids:
-                if (self.frame_idx - track.last_seen_frame) <= self.max_age:
-                    track.hit_streak = 0
-                    # Degradar estado si lleva mucho sin update
-                    if track.time_since_update > self.max_age // 3:
-                        track.state = 'tentative'
-                    updated_tracks.append(track)
+                track.hit_streak = 0
+                # Degradar estado si lleva mucho sin update
+                if track.time_since_update > self.max_age // 3:
+                    track.state = 'tentative'
+                updated_tracks.append(track)
+                kept_idx.append(idx)
+
+        # Cada detección produjo un track (matcheado o nuevo) en orden, seguido
+        # de los no matcheados: el estado SoA se arma con dos bloques
+        kept = np.array(kept_idx, dtype=np.intp)
+        self.last_seen = np.concatenate(
+            [np.full(len(detections), self.frame_idx, dtype=np.int32), self.last_seen[kept]]
+        )
 
         self.tracks = updated_tracks
         return self.tracks.copy()
@@ -243,6 +379,7 @@ class BoTSORTTracker:
     def reset(self):
         """Resetea el tracker (para nueva sesión)"""
         self.tracks = []
+        self.last_seen = np.empty(0, dtype=np.int32)
         self.frame_idx = 0
         self.next_id = 1
         logger.info("Tracker reseteado")
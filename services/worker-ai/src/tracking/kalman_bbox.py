@@ -9,7 +9,7 @@ Modela estado como [cx, cy, w, h, vx, vy, vw, vh] donde:
 """
 
 import numpy as np
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 
 
 class KalmanBBoxFilter:
@@ -172,3 +172,39 @@ class KalmanBBoxFilter:
         y2 = max(0.0, min(1.0, y2))
         
         return (x1, y1, x2, y2)
+
+
+def predict_batch(filters: List[KalmanBBoxFilter]) -> np.ndarray:
+    """
+    Predice varios filtros en una sola operación matricial.
+
+    Todos los filtros comparten F y Q (mismos parámetros de ruido), así que
+    la predicción de K tracks se resuelve con un matmul sobre (K, 8) y
+    (K, 8, 8) en lugar de K llamadas a predict().
+
+    Args:
+        filters: Filtros a predecir (se actualizan in-place)
+
+    Returns:
+        Array (K, 4) float32 con los bbox predichos en xyxy normalizado
+    """
+    if not filters:
+        return np.empty((0, 4), dtype=np.float32)
+
+    F = filters[0].F
+    Q = filters[0].Q
+    X = np.stack([kf.x for kf in filters]) @ F.T
+    P = F @ np.stack([kf.P for kf in filters]) @ F.T + Q
+
+    for i, kf in enumerate(filters):
+        kf.x = X[i]
+        kf.P = P[i]
+        kf.age += 1
+        kf.time_since_update += 1
+
+    # Misma conversión que _state_to_xyxy, vectorizada
+    cx, cy = X[:, 0], X[:, 1]
+    w = np.maximum(X[:, 2], np.float32(1e-6))
+    h = np.maximum(X[:, 3], np.float32(1e-6))
+    out = np.stack([cx - w / 2.0, cy - h / 2.0, cx + w / 2.0, cy + h / 2.0], axis=1)
+    return np.clip(out, 0.0, 1.0, out=out)
@@ -1,64 +1,299 @@
 """Framing de mensajes length-prefixed para TCP streams"""
 
+import socket
 import struct
 import asyncio
-from typing import Optional
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, Union
 
 from ..core.logger import setup_logger
 
 logger = setup_logger("transport.framing")
 
+# Prefijo de longitud: uint32 little-endian
+_LENGTH_PREFIX = struct.Struct("<I")
 
-class FrameReader:
-    """Lee mensajes length-prefixed desde un StreamReader"""
+# Mensaje recibido: bytes (chicos) o bytearray propio (grandes, sin copias extra)
+Message = Union[bytes, bytearray]
+
+
+class FrameProtocol(asyncio.BufferedProtocol):
+    """
+    Protocolo TCP que separa mensajes length-prefixed directo desde el socket
+
+    Reemplaza la capa StreamReader/StreamWriter: no hay un Future por lectura.
+    Los mensajes chicos se cortan de un buffer de recepción reutilizable; los
+    que no entran se reciben directamente en un bytearray de su tamaño exacto
+    (el kernel escribe en el buffer final). Los mensajes completos se encolan
+    y se consumen con FrameReader; con la cola llena se pausa la lectura del
+    socket (backpressure hacia el cliente).
+    """
+
+    # Buffer de recepción para mensajes chicos (heartbeats, init, frames JPEG)
+    RECV_BUFFER_SIZE = 256 * 1024
 
-    def __init__(self, reader: asyncio.StreamReader, max_size: int = 50 * 1024 * 1024):
+    def __init__(
+        self,
+        on_connection: Callable[["FrameProtocol"], Awaitable[None]],
+        max_size: int = 50 * 1024 * 1024,
+        max_pending: int = 2,
+    ):
         """
         Args:
-            reader: StreamReader de asyncio
+            on_connection: Corrutina que atiende la conexión (se lanza como Task)
             max_size: Tamaño máximo de mensaje en bytes (default 50MB)
+            max_pending: Mensajes completos encolados antes de pausar la lectura
         """
-        self.reader = reader
+        self._on_connection = on_connection
         self.max_size = max_size
+        self.max_pending = max(1, max_pending)
 
-    async def read_frame(self) -> Optional[bytes]:
-        """
-        Lee un frame completo del stream
+        self.transport: Optional[asyncio.Transport] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
 
-        Returns:
-            Bytes del mensaje o None si la conexión se cerró
-        """
-        try:
-            # Leer tamaño del mensaje (4 bytes, little-endian)
-            length_bytes = await self.reader.readexactly(4)
-            length = struct.unpack("<I", length_bytes)[0]
+        # Recepción: buffer reutilizable [start, end) + mensaje grande en curso
+        self._buf = bytearray(self.RECV_BUFFER_SIZE)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        self._large: Optional[bytearray] = None
+        self._large_got = 0
+
+        # Mensajes completos pendientes de leer
+        self._messages: Deque[Message] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+        self._eof = False
+        self._reading_paused = False
+
+        # Control de flujo de escritura
+        self._writing_paused = False
+        self._drain_waiters: Deque[asyncio.Future] = deque()
+        self._connection_lost = False
+        self._closed: Optional[asyncio.Future] = None
+
+    # ------------------------------------------------------------------
+    # Callbacks de asyncio
+    # ------------------------------------------------------------------
+
+    def connection_made(self, transport: asyncio.BaseTransport):
+        self.transport = transport
+        self._loop = asyncio.get_running_loop()
+        self._closed = self._loop.create_future()
+        self._task = self._loop.create_task(self._on_connection(self))
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self._large is not None:
+            return memoryview(self._large)[self._large_got :]
+
+        if self._end == len(self._buf):
+            # Buffer lleno: mover el mensaje parcial al principio
+            pending = self._end - self._start
+            self._buf[:pending] = self._view[self._start : self._end]
+            self._start, self._end = 0, pending
+
+        return self._view[self._end :]
+
+    def buffer_updated(self, nbytes: int):
+        if self._eof:
+            return
+
+        if self._large is not None:
+            self._large_got += nbytes
+            if self._large_got == len(self._large):
+                message, self._large, self._large_got = self._large, None, 0
+                self._push(message)
+            return
+
+        self._end += nbytes
+        self._parse()
+
+    def eof_received(self) -> bool:
+        logger.debug("Conexión cerrada por el cliente")
+        self._set_eof()
+        # Mantener el transporte abierto: las respuestas pendientes aún se envían
+        return True
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self._connection_lost = True
+        self._set_eof()
+
+        while self._drain_waiters:
+            waiter = self._drain_waiters.popleft()
+            if not waiter.done():
+                if exc is None:
+                    waiter.set_result(None)
+                else:
+                    waiter.set_exception(exc)
+
+        if self._closed is not None and not self._closed.done():
+            self._closed.set_result(None)
+
+    def pause_writing(self):
+        self._writing_paused = True
+
+    def resume_writing(self):
+        self._writing_paused = False
+        while self._drain_waiters:
+            waiter = self._drain_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    # ------------------------------------------------------------------
+    # Parsing
+    # ------------------------------------------------------------------
+
+    def _parse(self):
+        """Extrae los mensajes completos del buffer de recepción"""
+        view = self._view
+        while self._end - self._start >= 4:
+            (length,) = _LENGTH_PREFIX.unpack_from(self._buf, self._start)
 
             # Validar tamaño
             if length == 0 or length > self.max_size:
                 logger.error(f"Tamaño de mensaje inválido: {length} bytes")
+                self._start = self._end = 0
+                self._set_eof()
+                return
+
+            total = 4 + length
+            available = self._end - self._start
+            if available >= total:
+                self._push(bytes(view[self._start + 4 : self._start + total]))
+                self._start += total
+            elif length > self.RECV_BUFFER_SIZE // 2:
+                # No entra cómodo en el buffer: recibir el resto directo en su destino
+                message = bytearray(length)
+                received = available - 4
+                message[:received] = view[self._start + 4 : self._end]
+                self._large, self._large_got = message, received
+                self._start = self._end = 0
+                return
+            else:
+                break
+
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def _push(self, message: Message):
+        """Encola un mensaje completo y despierta al lector"""
+        self._messages.append(message)
+        self._wake_reader()
+
+        if not self._reading_paused and len(self._messages) >= self.max_pending:
+            self._reading_paused = True
+            self.transport.pause_reading()
+
+    def _set_eof(self):
+        """Fin de stream: tras los mensajes encolados las lecturas retornan None"""
+        self._eof = True
+        self._wake_reader()
+
+    def _wake_reader(self):
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    # ------------------------------------------------------------------
+    # API para FrameReader / FrameWriter
+    # ------------------------------------------------------------------
+
+    async def read_message(self) -> Optional[Message]:
+        """
+        Espera el siguiente mensaje completo
+
+        Returns:
+            Bytes del mensaje o None si la conexión se cerró
+        """
+        while not self._messages:
+            if self._eof:
                 return None
+            self._waiter = self._loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
 
-            # Leer mensaje
-            msg_bytes = await self.reader.readexactly(length)
-            return msg_bytes
+        message = self._messages.popleft()
+        if self._reading_paused and len(self._messages) < self.max_pending:
+            self._reading_paused = False
+            if not self.transport.is_closing():
+                self.transport.resume_reading()
+        return message
 
-        except asyncio.IncompleteReadError:
-            logger.debug("Conexión cerrada por el cliente")
-            return None
+    def feed_eof(self):
+        """Descarta lo pendiente: las lecturas en curso y futuras retornan None"""
+        self._messages.clear()
+        self._set_eof()
+
+    async def drain(self):
+        """Espera a que el buffer de escritura baje del high-water mark"""
+        if self.transport.is_closing():
+            # Igual que StreamWriter: ceder el loop para que corra connection_lost
+            await asyncio.sleep(0)
+        if self._connection_lost:
+            raise ConnectionResetError("Connection lost")
+        if not self._writing_paused:
+            return
+
+        waiter = self._loop.create_future()
+        self._drain_waiters.append(waiter)
+        await waiter
+
+    async def wait_closed(self):
+        """Espera a que el transporte termine de cerrarse"""
+        await asyncio.shield(self._closed)
+
+
+class FrameReader:
+    """Lee mensajes length-prefixed desde un FrameProtocol"""
+
+    def __init__(self, protocol: FrameProtocol):
+        """
+        Args:
+            protocol: Protocolo de la conexión (valida tamaños al separar mensajes)
+        """
+        self.protocol = protocol
+
+    async def read_frame(self) -> Optional[Message]:
+        """
+        Lee un frame completo del stream
+
+        Returns:
+            Bytes del mensaje o None si la conexión se cerró
+        """
+        try:
+            return await self.protocol.read_message()
         except Exception as e:
             logger.error(f"Error leyendo frame: {e}")
             return None
 
+    def close(self):
+        """Marca fin de stream: las lecturas pendientes y futuras retornan None"""
+        self.protocol.feed_eof()
+
 
 class FrameWriter:
-    """Escribe mensajes length-prefixed a un StreamWriter"""
+    """Escribe mensajes length-prefixed sobre el transporte de un FrameProtocol"""
 
-    def __init__(self, writer: asyncio.StreamWriter):
+    def __init__(self, protocol: FrameProtocol):
         """
         Args:
-            writer: StreamWriter de asyncio
+            protocol: Protocolo de la conexión
         """
-        self.writer = writer
+        self.protocol = protocol
+        self.transport = protocol.transport
+
+        # Deshabilitar Nagle: las respuestas son chicas y sensibles a latencia
+        sock = self.transport.get_extra_info("socket")
+        if sock is not None:
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except OSError as e:
+                logger.debug(f"No se pudo configurar TCP_NODELAY: {e}")
+
+        # High-water mark más alto: menos pausas de drain() con streams de alto fps
+        self.transport.set_write_buffer_limits(high=1 << 20)
 
     async def write_frame(self, data: bytes) -> bool:
         """
@@ -73,10 +308,10 @@ class FrameWriter:
         try:
             length = len(data)
 
-            # Escribir tamaño + datos
-            self.writer.write(struct.pack("<I", length))
-            self.writer.write(data)
-            await self.writer.drain()
+            # Escribir tamaño + datos en una sola llamada sin concatenar
+            # (el transporte los envía juntos, scatter/gather cuando puede)
+            self.transport.writelines((_LENGTH_PREFIX.pack(length), data))
+            await self.protocol.drain()
 
             return True
 
@@ -85,13 +320,13 @@ class FrameWriter:
             return False
 
     def is_closing(self) -> bool:
-        """Verifica si el writer está cerrándose"""
-        return self.writer.is_closing()
+        """Verifica si el transporte está cerrándose"""
+        return self.transport.is_closing()
 
     def close(self):
-        """Cierra el writer"""
-        self.writer.close()
+        """Cierra el transporte"""
+        self.transport.close()
 
     async def wait_closed(self):
-        """Espera a que el writer se cierre completamente"""
-        await self.writer.wait_closed()
+        """Espera a que el transporte se cierre completamente"""
+        await self.protocol.wait_closed()
@@ -1,11 +1,12 @@
 """Codec para traducir entre DTOs de dominio y mensajes Protobuf"""
 
-from typing import Optional, List, Dict, Any
+from typing import Optional, Sequence, Tuple
 from dataclasses import dataclass
 
 import ai_pb2 as pb
 
 from ..core.logger import setup_logger
+from ..pipeline.dto import Detection
 
 logger = setup_logger("transport.codec")
 
@@ -27,11 +28,19 @@ class ProtobufCodec:
     def __init__(self):
         self.stream_id: Optional[str] = None
         self._stream_id_logged = False
+        # Envelope reutilizado entre mensajes (evita una alocación por frame).
+        # El EnvelopeData devuelto referencia sub-mensajes de este objeto, por
+        # lo que solo es válido hasta el próximo decode_envelope().
+        self._envelope = pb.Envelope()
+        # Heartbeat pre-serializado: su contenido solo depende de stream_id
+        self._heartbeat: Optional[Tuple[Optional[str], bytes]] = None
 
     def decode_envelope(self, data: bytes) -> Optional[EnvelopeData]:
         """
         Decodifica un Envelope desde bytes
 
+        El resultado es válido hasta la siguiente llamada (el Envelope se reutiliza).
+
         Args:
             data: Bytes del mensaje protobuf
 
@@ -39,8 +48,9 @@ class ProtobufCodec:
             EnvelopeData o None si hay error
         """
         try:
-            envelope = pb.Envelope()
-            envelope.ParseFromString(data)
+            envelope = self._envelope
+            envelope.Clear()
+            envelope.MergeFromString(data)
 
             # Actualizar stream_id si está presente
             if envelope.stream_id:
@@ -125,44 +135,44 @@ class ProtobufCodec:
         return envelope.SerializeToString()
 
     def encode_result(
-        self, detections: List[Dict[str, Any]], frame_id: int, session_id: str
+        self, detections: Sequence[Detection], frame_id: int, session_id: str
     ) -> bytes:
         """
         Codifica un mensaje Result con detecciones
 
+        Construye el Envelope en una sola pasada, escribiendo cada detección
+        directamente en el mensaje protobuf (sin dicts ni CopyFrom intermedios).
+
         Args:
-            detections: Lista de dicts con detecciones
+            detections: Detecciones del frame (DTOs del pipeline)
             frame_id: ID del frame
             session_id: ID de la sesión
 
         Returns:
             Bytes del mensaje serializado
         """
-        detection_set = pb.DetectionSet()
-        for det in detections:
-            pb_det = detection_set.items.add()
-            pb_det.bbox.x1 = det["x1"]
-            pb_det.bbox.y1 = det["y1"]
-            pb_det.bbox.x2 = det["x2"]
-            pb_det.bbox.y2 = det["y2"]
-            pb_det.conf = det["confidence"]
-            pb_det.cls = det["class_name"]
-            pb_det.track_id = str(det.get("track_id", 0))
-
-        result = pb.Result()
-        result.frame_id = frame_id
-        result.frame_ref.session_id = session_id
-        result.detections.CopyFrom(detection_set)
-
-        response = pb.Response()
-        response.result.CopyFrom(result)
-
         envelope = pb.Envelope()
         envelope.protocol_version = 1
         envelope.msg_type = pb.MT_RESULT
         if self.stream_id:
             envelope.stream_id = self.stream_id
-        envelope.res.CopyFrom(response)
+
+        result = envelope.res.result
+        result.frame_id = frame_id
+        result.frame_ref.session_id = session_id
+        # Marcar el oneof aunque no haya detecciones
+        result.detections.SetInParent()
+
+        items = result.detections.items
+        for det in detections:
+            pb_det = items.add(
+                conf=det.confidence, cls=det.class_name, track_id=det.track_id or ""
+            )
+            bbox = pb_det.bbox
+            bbox.x1 = det.x1
+            bbox.y1 = det.y1
+            bbox.x2 = det.x2
+            bbox.y2 = det.y2
 
         return envelope.SerializeToString()
 
@@ -197,14 +207,21 @@ class ProtobufCodec:
         """
         Codifica un mensaje de heartbeat
 
+        Se serializa una sola vez por stream_id y luego se reutilizan los bytes.
+
         Returns:
             Bytes del mensaje serializado
         """
-        envelope = pb.Envelope()
-        envelope.protocol_version = 1
-        envelope.msg_type = pb.MT_HEARTBEAT
-        if self.stream_id:
-            envelope.stream_id = self.stream_id
-        envelope.hb.CopyFrom(pb.Heartbeat())
+        cached = self._heartbeat
+        if cached is None or cached[0] != self.stream_id:
+            envelope = pb.Envelope()
+            envelope.protocol_version = 1
+            envelope.msg_type = pb.MT_HEARTBEAT
+            if self.stream_id:
+                envelope.stream_id = self.stream_id
+            envelope.hb.SetInParent()
 
-        return envelope.SerializeToString()
+            cached = (self.stream_id, envelope.SerializeToString())
+            self._heartbeat = cached
+
+        return cached[1]
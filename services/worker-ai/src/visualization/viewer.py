@@ -1,11 +1,22 @@
 """Visualizador de detecciones y tracking"""
 
+import queue
+import threading
+
 import cv2
 import numpy as np
-from typing import List
+from typing import Callable, List, Optional, Union
 
+from ..core.logger import setup_logger
 from ..tracking.botsort import Track
 
+logger = setup_logger("visualization")
+
+# Fuente diferida del frame: se evalúa en el hilo del visualizador
+FrameSource = Callable[[], Optional[np.ndarray]]
+# Tracks a dibujar, ya armados o diferidos (se arman solo si el frame se muestra)
+TrackSource = Union[List[Track], Callable[[], List[Track]]]
+
 
 # Colores para diferentes clases (BGR)
 CLASS_COLORS = {
@@ -20,7 +31,13 @@ DEFAULT_COLOR = (128, 128, 128)  # Gris
 
 
 class Visualizer:
-    """Dibuja tracks en frames"""
+    """
+    Dibuja tracks en frames
+
+    Toda la interacción con HighGUI (namedWindow/imshow/waitKey) ocurre en un
+    hilo dedicado alimentado por una cola de un elemento: si la ventana no da
+    abasto se descarta el frame más viejo y las conexiones nunca esperan.
+    """
 
     def __init__(self, window_name: str = "AI Worker - Detections"):
         """
@@ -28,7 +45,11 @@ class Visualizer:
             window_name: Nombre de la ventana OpenCV
         """
         self.window_name = window_name
-        cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(
+            target=self._loop, name="visualizer", daemon=True
+        )
+        self._thread.start()
 
     def draw_tracks(self, frame: np.ndarray, tracks: List[Track]) -> np.ndarray:
         """
@@ -98,16 +119,75 @@ class Visualizer:
 
     def show(self, frame: np.ndarray, tracks: List[Track]):
         """
-        Dibuja y muestra el frame con tracks
+        Encola el frame con tracks para mostrarlo (no bloquea)
 
         Args:
             frame: Frame BGR
             tracks: Tracks activos
         """
-        annotated = self.draw_tracks(frame, tracks)
-        cv2.imshow(self.window_name, annotated)
-        cv2.waitKey(1)
+        self.submit(lambda: frame, tracks)
+
+    def submit(
+        self, source: FrameSource, tracks: TrackSource, info: Optional[str] = None
+    ):
+        """
+        Encola un frame cuya obtención (p.ej. decodificación) se difiere al
+        hilo del visualizador. Si hay un frame pendiente, se reemplaza.
+
+        Args:
+            source: Función que devuelve el frame BGR (o None para omitirlo)
+            tracks: Tracks a dibujar (o función que los arma en el hilo del visualizador)
+            info: Texto opcional a sobreimprimir (se dibuja sobre el frame)
+        """
+        self._put((source, tracks, info))
+
+    def _put(self, item: Optional[tuple]):
+        """Encola descartando el elemento pendiente (drop-oldest)"""
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _loop(self):
+        """Hilo de UI: obtiene, anota y muestra frames hasta recibir None"""
+        cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+
+                source, tracks, info = item
+                try:
+                    frame = source()
+                    if frame is None:
+                        continue
+                    if info:
+                        cv2.putText(
+                            frame,
+                            info,
+                            (10, 30),
+                            cv2.FONT_HERSHEY_SIMPLEX,
+                            0.7,
+                            (0, 255, 0),
+                            2,
+                        )
+                    if callable(tracks):
+                        tracks = tracks()
+                    annotated = self.draw_tracks(frame, tracks)
+                    cv2.imshow(self.window_name, annotated)
+                    cv2.waitKey(1)
+                except Exception as e:
+                    logger.warning(f"Error mostrando frame: {e}")
+        finally:
+            cv2.destroyWindow(self.window_name)
 
     def close(self):
-        """Cierra la ventana"""
-        cv2.destroyWindow(self.window_name)
+        """Detiene el hilo y cierra la ventana"""
+        self._put(None)
+        self._thread.join(timeout=2.0)